@@ -5,15 +5,39 @@
 # application factory. It's responsible for all application setup.
 # ==============================================================================
 
+import atexit
+import importlib.util
 import firebase_admin
+import httpx
 from firebase_admin import credentials, firestore
-from flask import Flask
+from flask import Flask, session
 from config import Config
 from flask_mail import Mail
+from .services.shared_cache import SQLiteCache
 
 # Define the mail object in the global scope. It will be initialized later.
 mail = Mail()
 
+def _create_leetcode_client(config):
+    """
+    Builds the process-wide HTTP client used for all LeetCode GraphQL calls.
+    Connections are kept alive and pooled between requests, and HTTP/2 is
+    used when enabled and the optional 'h2' package is installed.
+    """
+    use_http2 = config['LEETCODE_HTTP2'] and importlib.util.find_spec('h2') is not None
+    limits = httpx.Limits(
+        max_connections=config['LEETCODE_POOL_MAX_CONNECTIONS'],
+        max_keepalive_connections=config['LEETCODE_POOL_MAX_KEEPALIVE'],
+        keepalive_expiry=config['LEETCODE_KEEPALIVE_EXPIRY']
+    )
+    timeout = httpx.Timeout(
+        connect=config['LEETCODE_CONNECT_TIMEOUT'],
+        read=config['LEETCODE_READ_TIMEOUT'],
+        write=config['LEETCODE_WRITE_TIMEOUT'],
+        pool=config['LEETCODE_POOL_TIMEOUT']
+    )
+    return httpx.Client(http2=use_http2, limits=limits, timeout=timeout)
+
 def create_app(config_class=Config):
     """
     Application factory function. Configures and returns the Flask app.
@@ -24,6 +48,13 @@ def create_app(config_class=Config):
     # Initialize the mail object with the application instance
     mail.init_app(app)
 
+    # Deliver email from background workers instead of inside the request
+    from .services.mail_queue import MailQueue
+    mail_queue = MailQueue(app) if app.config['MAIL_QUEUE_ENABLED'] else None
+    app.config['MAIL_QUEUE'] = mail_queue
+    if mail_queue:
+        atexit.register(mail_queue.close)
+
     # Initialize Firebase Admin SDK
     if not firebase_admin._apps:
         cred_path = app.config['FIREBASE_CREDENTIALS_PATH']
@@ -40,6 +71,41 @@ def create_app(config_class=Config):
     # Store the db client in the app config for easy access
     db_client = firestore.client()
     app.config['DB'] = db_client
+
+    # Create the pooled LeetCode client once per worker and close it on shutdown
+    leetcode_client = _create_leetcode_client(app.config)
+    app.config['LEETCODE_CLIENT'] = leetcode_client
+    atexit.register(leetcode_client.close)
+
+    # Optional host-wide cache so all gunicorn workers share LeetCode/Firestore reads
+    shared_cache_path = app.config['SHARED_CACHE_PATH']
+    app.config['SHARED_CACHE'] = (
+        SQLiteCache(shared_cache_path, app.config['SHARED_CACHE_MAX_ENTRIES']) if shared_cache_path else None
+    )
+    
+    # Keep recently active users' LeetCode data warm in the background
+    from .services.cache_warmer import CacheWarmer
+    app.config['CACHE_WARMER'] = CacheWarmer(app) if app.config['CACHE_WARMER_ENABLED'] else None
+
+    @app.before_request
+    def track_active_user():
+        warmer = app.config['CACHE_WARMER']
+        if warmer:
+            warmer.touch(session.get('leetcode_username'))
+
+    from .services import firebase_service
+    from .services.problem_catalog import ProblemCatalog
+
+    # Memory-mapped problem catalog; the search index covers it plus the NeetCode list
+    catalog = ProblemCatalog(app.config['PROBLEM_CATALOG_PATH'], app.config['PROBLEM_CATALOG_MMAP_SIZE'])
+    app.config['PROBLEM_CATALOG'] = catalog
+    catalog.refresh_search_index()
+
+    # Every template gets the navbar's pending friend request count
+    @app.context_processor
+    def inject_pending_requests_count():
+        username = session.get('leetcode_username')
+        return {'pending_requests_count': firebase_service.get_pending_request_count(username) if username else 0}
     
     # --- Import and Register All Blueprints ---
     from .routes.main import bp as main_bp
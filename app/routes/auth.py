@@ -8,7 +8,7 @@
 import random
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
-from app.services import firebase_service, leetcode_api, email_service
+from app.services import firebase_service, leetcode_api, email_service, global_ranking
 from firebase_admin import auth as firebase_admin_auth
 
 bp = Blueprint('auth', __name__)
@@ -52,6 +52,7 @@ def verify():
             firebase_service.verify_user_and_set_password(username, password_hash)
             session.pop('verifying_username', None)
             session['leetcode_username'] = username
+            global_ranking.register_user(username)
             flash('Account verified successfully! You are now logged in.', 'success')
             return redirect(url_for('dashboard.user_dashboard'))
         else:
@@ -67,6 +68,7 @@ def login():
         user_data = firebase_service.get_user_by_email(email)
         if user_data and user_data.get('is_verified') and check_password_hash(user_data.get('password_hash', ''), password):
             session['leetcode_username'] = user_data['leetcode_username']
+            global_ranking.register_user(user_data['leetcode_username'])
             return redirect(url_for('dashboard.user_dashboard'))
         else:
             flash('Invalid email or password.', 'error')
@@ -125,6 +127,7 @@ def google_login():
         if user_data:
             # User exists, log them in by setting the session and return 'ok' status
             session['leetcode_username'] = user_data['leetcode_username']
+            global_ranking.register_user(user_data['leetcode_username'])
             return jsonify({'status': 'ok'})
         else:
             # User is new to our app, tell the frontend to ask for a LeetCode ID
@@ -166,6 +169,7 @@ def google_register():
         
         # Log the new user in
         session['leetcode_username'] = leetcode_id
+        global_ranking.register_user(leetcode_id)
         return jsonify({'status': 'ok'})
 
     except Exception as e:
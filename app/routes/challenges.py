@@ -6,38 +6,34 @@
 # ==============================================================================
 
 import datetime
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
-from app.services import firebase_service, leetcode_api
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify, current_app
+from app.services import firebase_service, solved_index, challenge_progress, email_service, problem_catalog, problem_search
 
 bp = Blueprint('challenges', __name__)
 
-def calculate_progress(user_submissions, challenge_problems):
-    if not user_submissions: user_submissions = []
-    if not challenge_problems: return 0
-    solved_slugs = {sub['titleSlug'] for sub in user_submissions if sub['statusDisplay'] == 'Accepted'}
-    solved_count = 0
-    for problem in challenge_problems:
-        if problem.get('titleSlug') in solved_slugs:
-            solved_count += 1
-    return solved_count
-
 @bp.route('/challenges/')
 def challenges_page():
     main_username = session.get('leetcode_username')
     if not main_username:
         return redirect(url_for('main.home'))
     
+    # Syncing the viewer's own solves updates the stored progress of their
+    # challenges. Other participants of live challenges are re-synced once
+    # this worker last synced them SOLVED_INDEX_SYNC_TTL ago, so friends who
+    # never open Progex still move.
+    solved_index.sync_user(main_username)
     all_challenges = firebase_service.get_user_challenges(main_username)
-    
-    unique_participants = {main_username}
-    for c in all_challenges:
-        for p in c.get('participants', {}).keys():
-            unique_participants.add(p)
-            
-    submissions_cache = {
-        username: leetcode_api.get_recent_submissions(username, 50) 
-        for username in unique_participants
-    }
+    participants = set()
+    for challenge in all_challenges:
+        expires_at = challenge.get('expiresAt')
+        if expires_at and expires_at < datetime.datetime.now(expires_at.tzinfo):
+            continue
+        participants.update(name for name, data in challenge.get('participants', {}).items()
+                            if data.get('status') == 'accepted')
+    participants.discard(main_username)
+    if solved_index.sync_users(participants):
+        # The syncs may have moved the stored summaries just read
+        all_challenges = firebase_service.get_user_challenges(main_username)
     
     invitations, pending, ongoing, completed_expired = [], [], [], []
     
@@ -58,43 +54,23 @@ def challenges_page():
             hours, _ = divmod(rem, 3600)
             challenge['time_left'] = f"{int(days)}d {int(hours)}h left"
         
-        challenge_problems = challenge.get('problems', [])
-        total_count = len(challenge_problems)
-        user_submissions = submissions_cache.get(main_username, [])
-        solved_count = calculate_progress(user_submissions, challenge_problems)
+        summary = challenge_progress.get_summary(challenge)
+        total_count = summary['total_problems']
+        solved_count = summary['counts'].get(main_username, 0)
         
         challenge.update({
             'progress': solved_count,
             'total_problems': total_count,
             'progress_percent': (solved_count / total_count * 100) if total_count > 0 else 0,
-            'is_completed_by_user': (solved_count >= total_count) if total_count > 0 else False
+            'is_completed_by_user': (solved_count >= total_count) if total_count > 0 else False,
+            'participants_completed': [{'username': name} for name in summary['participants_completed']],
+            'participants_inprogress': [{'username': name} for name in summary['participants_inprogress']],
+            'participants_invited': [{'username': name} for name in summary['participants_invited']],
+            'is_fully_completed': summary['is_fully_completed']
         })
         
-        participants_completed, participants_inprogress, participants_invited = [], [], []
-        accepted_participants_names = []
-        
-        for name, data in challenge.get('participants', {}).items():
-            status = data.get('status')
-            p_info = {'username': name}
-            if status == 'accepted':
-                accepted_participants_names.append(name)
-                p_progress = calculate_progress(submissions_cache.get(name, []), challenge_problems)
-                if p_progress >= total_count:
-                    participants_completed.append(p_info)
-                else:
-                    participants_inprogress.append(p_info)
-            elif status == 'invited':
-                participants_invited.append(p_info)
-        
-        challenge.update({
-            'participants_completed': participants_completed,
-            'participants_inprogress': participants_inprogress,
-            'participants_invited': participants_invited
-        })
-        
-        challenge_has_enough_players = len(accepted_participants_names) >= 2
-        is_fully_completed = bool(accepted_participants_names) and not participants_inprogress and not participants_invited
-        challenge['is_fully_completed'] = is_fully_completed
+        challenge_has_enough_players = summary['accepted_count'] >= 2
+        is_fully_completed = summary['is_fully_completed']
 
         if user_status == 'invited' and not is_expired:
             invitations.append(challenge)
@@ -104,16 +80,12 @@ def challenges_page():
             ongoing.append(challenge)
         else:
             completed_expired.append(challenge)
-    
-    # FIX: Fetch and pass the count for the navbar notification dot
-    pending_requests_count = len(firebase_service.get_pending_requests(main_username))
             
     return render_template('challenges.html', 
                            invitations=invitations,
                            pending=pending,
                            ongoing=ongoing, 
-                           completed_expired=completed_expired,
-                           pending_requests_count=pending_requests_count)
+                           completed_expired=completed_expired)
 
 
 @bp.route('/challenges/create', methods=['GET', 'POST'])
@@ -134,8 +106,14 @@ def create_challenge():
             flash("All fields are required.", "error")
             return redirect(url_for('challenges.create_challenge'))
         
-        problem_slugs_raw = [slug.strip() for slug in problems_text.split(',') if slug.strip()]
-        problems_list = [{'title': slug.replace('-', ' ').title(), 'titleSlug': slug} for slug in problem_slugs_raw]
+        problem_slugs_raw = [slug.strip().lower() for slug in problems_text.split(',') if slug.strip()]
+        # Titles and metadata come from the local catalog; unknown slugs are rejected
+        problems_list, unknown_slugs = problem_catalog.resolve_problems(
+            current_app.config['PROBLEM_CATALOG'], problem_slugs_raw
+        )
+        if unknown_slugs:
+            flash(f"Unknown problem(s): {', '.join(unknown_slugs)}", "error")
+            return redirect(url_for('challenges.create_challenge'))
         expires_at = datetime.datetime.strptime(expires_str, '%Y-%m-%d').replace(hour=23, minute=59, second=59)
         participants = {main_username: {'status': 'accepted'}}
         for friend in invited_friends:
@@ -146,8 +124,11 @@ def create_challenge():
             'problems': problems_list, 'expiresAt': expires_at, 'status': 'active',
             'participants': participants
         }
-        success = firebase_service.create_challenge(new_challenge_data)
-        if success:
+        new_challenge_data['progress_summary'] = challenge_progress.build_summary(new_challenge_data)
+        challenge_id = firebase_service.create_challenge(new_challenge_data)
+        if challenge_id:
+            # One batched email to every invited friend, delivered in the background
+            email_service.send_challenge_invitations(challenge_id, new_challenge_data, invited_friends)
             flash("Challenge created successfully! It will become active once a friend accepts.", "success")
             return redirect(url_for('challenges.challenges_page'))
         else:
@@ -155,9 +136,7 @@ def create_challenge():
             return redirect(url_for('challenges.create_challenge'))
 
     friends_list = firebase_service.get_friends(main_username)
-    # FIX: Fetch and pass the count for the navbar notification dot
-    pending_requests_count = len(firebase_service.get_pending_requests(main_username))
-    return render_template('create_challenge.html', friends=friends_list, pending_requests_count=pending_requests_count)
+    return render_template('create_challenge.html', friends=friends_list)
 
 
 @bp.route('/challenges/respond/<string:challenge_id>/<string:response>', methods=['POST'])
@@ -167,6 +146,7 @@ def respond_to_challenge(challenge_id, response):
         return redirect(url_for('auth.login'))
     if response in ['accepted', 'declined']:
         firebase_service.update_challenge_participant_status(challenge_id, main_username, response)
+        challenge_progress.refresh_buckets(challenge_id)
         flash(f"You have {response} the challenge!", "success")
     return redirect(url_for('challenges.challenges_page'))
 
@@ -200,12 +180,11 @@ def edit_challenge(challenge_id):
             'description': request.form.get('description')
         }
         firebase_service.update_challenge_details(challenge_id, updated_data)
+        challenge_progress.refresh_challenge(challenge_id)
         flash("Challenge details updated successfully.", "success")
         return redirect(url_for('challenges.challenges_page'))
     
-    # FIX: Fetch and pass the count for the navbar notification dot
-    pending_requests_count = len(firebase_service.get_pending_requests(main_username))
-    return render_template('edit_challenge.html', challenge=challenge, pending_requests_count=pending_requests_count)
+    return render_template('edit_challenge.html', challenge=challenge)
 
 @bp.route('/challenges/search-problems')
 def search_problems():
@@ -214,6 +193,9 @@ def search_problems():
     if not query:
         return jsonify([])
         
-    # Use our new service function to find matching problems
-    results = firebase_service.search_study_plan_questions(query)
-    return jsonify(results)
+    # Pick up a catalog synced by another worker before searching
+    current_app.config['PROBLEM_CATALOG'].refresh_search_index()
+    # Ranked lookup against the prebuilt index; results only change on redeploy or catalog sync
+    response = jsonify(problem_search.search(query))
+    response.headers['Cache-Control'] = 'public, max-age=300'
+    return response
@@ -5,9 +5,9 @@
 # to the template, fixing the UndefinedError.
 # ==============================================================================
 
-from flask import Blueprint, render_template, session, redirect, url_for, flash
-# We need to import firebase_service to get the request count
-from app.services import leetcode_api, firebase_service 
+import datetime
+from flask import Blueprint, render_template, session, redirect, url_for, flash, current_app
+from app.services import leetcode_api, stat_history, submission_calendar
 
 bp = Blueprint('dashboard', __name__)
 
@@ -15,17 +15,16 @@ bp = Blueprint('dashboard', __name__)
 def user_dashboard():
     """
     Renders the main dashboard page for the logged-in user.
-    Fetches user stats, recent submissions, and friend request count.
+    Fetches user stats and recent submissions. The friend request count
+    is provided to every template by the app's context processor.
     """
     username = session.get('leetcode_username')
     if not username:
         return redirect(url_for('main.home'))
 
-    # Fetch the primary user stats from the API service.
-    stats = leetcode_api.get_user_stats(username)
-    
-    # FIX: Initialize the count here to ensure it always has a value
-    pending_requests_count = 0
+    # Profile, counts, calendar and recent submissions all come from one cached snapshot.
+    snapshot = leetcode_api.get_user_snapshot(username)
+    stats = snapshot['stats'] if snapshot else None
     
     # This is a crucial error check. If the API fails, we prevent a crash.
     if not stats:
@@ -37,15 +36,23 @@ def user_dashboard():
         }
         problems = []
     else:
-        # If stats were fetched successfully, get the other necessary data.
-        problems = leetcode_api.get_recent_submissions(username, 10)
-        # FIX: Fetch the count of pending friend requests
-        pending_requests_count = len(firebase_service.get_pending_requests(username))
+        problems = snapshot['submissions'][:10]
+
+    # Daily snapshots for the trend chart: one read per calendar year in range
+    today = datetime.date.today()
+    history = stat_history.get_range(
+        username, today - datetime.timedelta(days=current_app.config['STAT_HISTORY_DASHBOARD_DAYS'] - 1), today
+    )
+
+    # Activity heatmap from the stored calendar, topped up with the fresh one
+    day_counts = submission_calendar.get_years([username], today.year, {username: stats})[username]
 
-    # Render the template, passing all necessary data, including the new count.
+    # Render the template, passing all necessary data.
     return render_template('dashboard.html', 
                            stats=stats, 
                            problems=problems,
-                           pending_requests_count=pending_requests_count)
+                           history=history,
+                           heatmap_year=today.year,
+                           heatmap_weeks=submission_calendar.heatmap(day_counts, today.year))
 
 # The '/daily' route has been removed.
\ No newline at end of file
@@ -5,12 +5,17 @@
 # to all relevant templates, fixing the UndefinedError.
 # ==============================================================================
 
+import datetime
 import json
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash
-from app.services import firebase_service, leetcode_api
+import re
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, current_app
+from app.services import firebase_service, global_ranking, leaderboard, leetcode_api, submission_calendar
 
 bp = Blueprint('social', __name__)
 
+# LeetCode usernames are letters, digits, '_' and '-'; anything else cannot exist upstream
+_USERNAME_PATTERN = re.compile(r'[a-z0-9_-]+')
+
 
 @bp.route('/friends', methods=['GET', 'POST'])
 def friends_page():
@@ -24,11 +29,11 @@ def friends_page():
 
     if request.method == 'POST':
         friend_username = request.form.get('friend_username', '').lower()
-        user_data = firebase_service.get_user_data(main_username)
-        current_friends = user_data.get('friends', [])
+        user_data = firebase_service.get_users_data([main_username])[0]
+        current_friends = (user_data or {}).get('friends', [])
         
         if friend_username and friend_username != main_username and friend_username not in current_friends:
-            if leetcode_api.get_user_stats(friend_username):
+            if _USERNAME_PATTERN.fullmatch(friend_username) and leetcode_api.get_user_stats(friend_username):
                 result = firebase_service.create_friend_request(main_username, friend_username)
                 flash(result, "info")
             else:
@@ -41,12 +46,15 @@ def friends_page():
         return redirect(url_for('social.friends_page'))
     
     friend_usernames = firebase_service.get_friends(main_username)
-    friends_data = [stats for username in friend_usernames if (stats := leetcode_api.get_user_stats(username))]
-    
-    # FIX: Fetch and pass the count for the navbar notification dot
-    pending_requests_count = len(firebase_service.get_pending_requests(main_username))
+    friends_stats = leetcode_api.get_user_stats_many(friend_usernames)
+    friends_data = [stats for username in friend_usernames if (stats := friends_stats.get(username))]
+
+    # Every friend's yearly heatmap comes from one batched calendar read
+    year = datetime.date.today().year
+    calendars = submission_calendar.get_years([friend['username'] for friend in friends_data], year, friends_stats)
+    heatmaps = {username: submission_calendar.heatmap(day_counts, year) for username, day_counts in calendars.items()}
     
-    return render_template('friends.html', friends=friends_data, pending_requests_count=pending_requests_count)
+    return render_template('friends.html', friends=friends_data, heatmaps=heatmaps, heatmap_year=year)
 
 
 @bp.route('/friends/remove/<string:friend_username>', methods=['POST'])
@@ -75,27 +83,39 @@ def leaderboard_page():
     if not main_username:
         return redirect(url_for('main.home'))
 
-    my_stats = leetcode_api.get_user_stats(main_username)
-    friend_list = firebase_service.get_friends(main_username)
-    
-    leaderboard_data = []
-    if my_stats:
-        leaderboard_data.append(my_stats)
-    
-    for friend_username in friend_list:
-        stats = leetcode_api.get_user_stats(friend_username)
-        if stats:
-            leaderboard_data.append(stats)
-            
-    sorted_leaderboard = sorted(leaderboard_data, key=lambda x: x.get('totalSolved', 0), reverse=True)
-    
-    # FIX: Fetch and pass the count for the navbar notification dot
-    pending_requests_count = len(firebase_service.get_pending_requests(main_username))
+    # The board is materialized and kept current as stats refresh: one document read
+    board = leaderboard.get_board(main_username)
     
     return render_template('leaderboard.html', 
-                           leaderboard_data=sorted_leaderboard,
-                           chart_data=sorted_leaderboard,
-                           pending_requests_count=pending_requests_count)
+                           leaderboard_data=board.get('entries', []),
+                           trend_data=leaderboard.trend_series(board))
+
+
+@bp.route('/leaderboard/global')
+def global_leaderboard_page():
+    """
+    Displays one page of the ranking of all registered users, plus the
+    current user's own rank and percentile for every difficulty.
+    """
+    main_username = session.get('leetcode_username')
+    if not main_username:
+        return redirect(url_for('main.home'))
+
+    metric = request.args.get('metric', 'totalSolved')
+    if metric not in global_ranking.METRICS:
+        metric = 'totalSolved'
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['GLOBAL_RANKING_PAGE_SIZE']
+
+    rows, total_users = global_ranking.get_page(metric, page, per_page)
+    return render_template('global_leaderboard.html',
+                           rows=rows,
+                           metric=metric,
+                           metrics=global_ranking.METRICS,
+                           page=page,
+                           total_pages=max((total_users + per_page - 1) // per_page, 1),
+                           total_users=total_users,
+                           standing=global_ranking.get_standing(main_username))
 
 
 @bp.route('/requests')
@@ -125,7 +145,7 @@ def respond_to_request(request_id, action):
         else:
             flash("Error accepting request. It may have been withdrawn.", "error")
     elif action == 'reject':
-        firebase_service.reject_friend_request(request_id)
+        firebase_service.reject_friend_request(request_id, main_username)
         flash("Friend request rejected.", "info")
     
     return redirect(url_for('social.requests_page'))
\ No newline at end of file
@@ -5,8 +5,8 @@
 # including the developer routes for seeding the database.
 # ==============================================================================
 
-from flask import Blueprint, render_template, redirect, url_for, session, flash
-from app.services import firebase_service
+from flask import Blueprint, render_template, redirect, url_for, session, flash, current_app, jsonify
+from app.services import email_service, firebase_service, global_ranking, leetcode_api, problem_catalog, stat_history
 from werkzeug.security import check_password_hash # Needed for delete_account
 from flask import request # Needed for delete_account
 
@@ -63,6 +63,7 @@ def delete_account():
     if user_data and check_password_hash(user_data.get('password_hash', ''), password):
         success = firebase_service.delete_user_account(main_username)
         if success:
+            global_ranking.unregister_user(main_username)
             session.clear()
             flash('Your account has been permanently deleted.', 'info')
             return redirect(url_for('main.home'))
@@ -97,9 +98,96 @@ def seed_neetcode_route():
     flash(result, 'info')
     # Redirect to the study plan page so you can immediately see the result
     return redirect(url_for('study_plan.view_study_plan'))
+
+
+@bp.route('/migrate-challenge-participants')
+def migrate_challenge_participants_route():
+    """
+    A special, hidden route for developers to backfill the participant index
+    on challenges created before it was introduced.
+    """
+    result = firebase_service.backfill_participant_usernames()
+    flash(result, 'info')
+    return redirect(url_for('challenges.challenges_page'))
+
+
+@bp.route('/sync-problem-catalog')
+def sync_problem_catalog_route():
+    """
+    A special, hidden route for developers to download LeetCode's full
+    problem list into the local catalog used by challenge creation and search.
+    The download runs in the background and logs its result when it finishes.
+    """
+    if problem_catalog.start_sync(current_app.config['PROBLEM_CATALOG'],
+                                  current_app.config['PROBLEM_CATALOG_PAGE_SIZE']):
+        flash('Syncing the problem catalog in the background.', 'info')
+    else:
+        flash('A problem catalog sync is already running.', 'info')
+    return redirect(url_for('challenges.create_challenge'))
+
+
+@bp.route('/send-challenge-digests')
+def send_challenge_digests_route():
+    """
+    A special, hidden route for developers (or a daily cron job) that emails
+    participants a digest of their challenges expiring in the next day.
+    The run happens in the background and logs its result when it finishes.
+    """
+    if email_service.start_expiring_challenge_digests():
+        flash('Sending expiring challenge digests in the background.', 'info')
+    else:
+        flash('Expiring challenge digests are already being sent.', 'info')
+    return redirect(url_for('challenges.challenges_page'))
+
+
+@bp.route('/snapshot-stat-history')
+def snapshot_stat_history_route():
+    """
+    A special, hidden route for a daily cron job (or developers) that stores
+    today's stat snapshot for every registered user, in the background.
+    """
+    if stat_history.start_daily_snapshots():
+        flash('Recording daily stat snapshots in the background.', 'info')
+    else:
+        flash('Daily stat snapshots are already being recorded.', 'info')
+    return redirect(url_for('dashboard.user_dashboard'))
+
+
+@bp.route('/rebuild-global-ranking')
+def rebuild_global_ranking_route():
+    """
+    A special, hidden route for developers to backfill the global ranking
+    with every registered user; afterwards it is kept up to date incrementally.
+    The backfill runs in the background and logs its result when it finishes.
+    """
+    if global_ranking.start_rebuild():
+        flash('Rebuilding the global ranking in the background.', 'info')
+    else:
+        flash('A global ranking rebuild is already running.', 'info')
+    return redirect(url_for('social.global_leaderboard_page'))
+
+
+@bp.route('/status')
+def status_route():
+    """
+    A special, hidden route for developers that reports, as JSON, this
+    worker's view of leetcode.com health (circuit breaker, retry budget,
+    rate limiter) and the counters of its caches and background services.
+    """
+    shared_cache = current_app.config['SHARED_CACHE']
+    mail_queue = current_app.config['MAIL_QUEUE']
+    warmer = current_app.config['CACHE_WARMER']
+    return jsonify({
+        'upstream': leetcode_api.get_upstream_health(),
+        'caches': leetcode_api.get_cache_stats(),
+        'coalescing': leetcode_api.get_coalescing_stats(),
+        'shared_cache': shared_cache.stats() if shared_cache else None,
+        'mail_queue': mail_queue.stats() if mail_queue else None,
+        'cache_warmer': warmer.stats() if warmer else None,
+        'problem_catalog': current_app.config['PROBLEM_CATALOG'].stats()
+    })
+
+
 @bp.route('/about')
 def about_page():
-    pending_requests_count = 0
-    if 'leetcode_username' in session:
-        pending_requests_count = len(firebase_service.get_pending_requests(session['leetcode_username']))
-    return render_template('about.html', pending_requests_count=pending_requests_count)
+    return render_template('about.html')
@@ -6,8 +6,7 @@
 # ==============================================================================
 
 from flask import Blueprint, render_template, session, redirect, url_for, flash
-from app.services import firebase_service, leetcode_api
-from collections import defaultdict
+from app.services import firebase_service, solved_index
 
 bp = Blueprint('study_plan', __name__)
 
@@ -17,23 +16,23 @@ def view_study_plan():
     if not username:
         return redirect(url_for('auth.login'))
 
-    plan_questions = firebase_service.get_study_plan_questions()
+    # Served from the per-worker plan cache; no Firestore reads for questions
+    plan = firebase_service.get_study_plan()
+    plan_questions = plan['questions']
     user_progress = firebase_service.get_or_initialize_user_study_plan(username)
     
-    # FIX: Fetch the count of pending friend requests for the navbar dot
-    pending_requests_count = len(firebase_service.get_pending_requests(username))
-    
     if not plan_questions:
         flash("The study plan questions have not been seeded yet. Run the seeder.", "error")
-        # Pass the count even on redirect to prevent brief errors
         return redirect(url_for('dashboard.user_dashboard'))
 
-    recent_submissions = leetcode_api.get_recent_submissions(username, 100)
-    solved_slugs = {sub['titleSlug'] for sub in recent_submissions if sub['statusDisplay'] == 'Accepted'}
+    # The stored index keeps every solve, not just the latest submission window
+    solved_slugs = solved_index.sync_user(username)
 
-    grouped_questions = defaultdict(list)
-    for question in plan_questions:
-        grouped_questions[question.get('topic', 'General')].append(question)
+    grouped_questions = plan['grouped_questions']
+    # Per-topic completion is a popcount of the user's bitset AND the topic's cached bitset
+    topic_solved_counts = {
+        topic: solved_slugs.count_common(bits) for topic, bits in plan['topic_bitsets'].items()
+    }
     
     current_index = user_progress.get('current_question_index', 0)
     total_questions = len(plan_questions)
@@ -44,7 +43,7 @@ def view_study_plan():
                                all_questions_completed=True,
                                grouped_questions=grouped_questions,
                                solved_slugs=solved_slugs,
-                               pending_requests_count=pending_requests_count) # Pass the count
+                               topic_solved_counts=topic_solved_counts)
 
     current_question = plan_questions[current_index]
     is_current_solved = current_question['titleSlug'] in solved_slugs
@@ -56,7 +55,7 @@ def view_study_plan():
                            is_current_solved=is_current_solved,
                            grouped_questions=grouped_questions,
                            solved_slugs=solved_slugs,
-                           pending_requests_count=pending_requests_count) # Pass the count
+                           topic_solved_counts=topic_solved_counts)
 
 @bp.route('/study-plan/next', methods=['POST'])
 def advance_to_next_question():
@@ -0,0 +1,40 @@
+# ==============================================================================
+# Background Jobs
+# ------------------------------------------------------------------------------
+# This file runs long maintenance tasks (full backfills, catalog downloads,
+# daily snapshots) on their own daemon thread inside an app context, so the
+# developer routes that start them return immediately instead of running into
+# gunicorn's request timeout. Each job name runs at most once at a time per
+# worker; its result is logged when it finishes.
+# ==============================================================================
+
+import threading
+from flask import current_app
+
+_running = {}
+_lock = threading.Lock()
+
+
+def _run(app, name, func, args):
+    try:
+        with app.app_context():
+            result = func(*args)
+    except Exception as e:
+        print(f"Background Job Error ({name}): {e}")
+        result = f"Failed: {e}"
+    with _lock:
+        _running.pop(name, None)
+    print(f"Background Job ({name}): {result}")
+
+
+def start(name, func, *args):
+    """Starts func(*args) in the background; returns False if a job with that name is still running."""
+    app = current_app._get_current_object()
+    with _lock:
+        if name in _running:
+            return False
+        thread = threading.Thread(target=_run, args=(app, name, func, args), name=f"job-{name}", daemon=True)
+        _running[name] = thread
+    thread.start()
+    return True
+
@@ -0,0 +1,211 @@
+# ==============================================================================
+# In-Process Cache
+# ------------------------------------------------------------------------------
+# This file provides a small, thread-safe TTL + LRU cache used to keep LeetCode
+# data between page views. Each entry has a soft TTL (after which it is served
+# stale while a background refresh runs) and a hard TTL (after which it is
+# dropped and must be reloaded before it can be served). An optional shared
+# backend (see shared_cache.py) lets workers on one host reuse each other's data.
+# ==============================================================================
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+FRESH, STALE, MISS = 'fresh', 'stale', 'miss'
+
+
+class TTLCache:
+    def __init__(self, name, soft_ttl, hard_ttl, max_entries, schedule=None, backend=None, clock=time.time):
+        """
+        'schedule' is a callable like schedule(func, *args) used to run
+        stale-while-revalidate refreshes in the background. Without it,
+        stale entries are refreshed inline. 'backend' is an optional shared
+        store consulted on local misses and written through on every set.
+        'clock' returns the current time in seconds (tests pass a fake one).
+        """
+        self._clock = clock
+        self.name = name
+        self.backend = backend
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = max(hard_ttl, soft_ttl)
+        self.max_entries = max_entries
+        self._schedule = schedule
+        self._entries = OrderedDict()  # key -> (value, soft_expiry, hard_expiry)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.hits = self.stale_hits = self.misses = self.shared_hits = 0
+        self.evictions = self.refreshes = self.refresh_failures = 0
+
+    def _backend_key(self, key):
+        return f"{self.name}:{json.dumps(key)}"
+
+    def _lookup_backend(self, key, now):
+        """On a local miss, pulls the entry from the shared backend (if any)."""
+        if self.backend is None:
+            return None
+        entry = self.backend.get(self._backend_key(key))
+        if entry is None:
+            return None
+        value, soft_expiry, hard_expiry = entry
+        self._store(key, value, soft_expiry, hard_expiry)
+        return value, (STALE if now >= soft_expiry else FRESH)
+
+    def lookup(self, key):
+        """Returns (value, state) where state is FRESH, STALE or MISS."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, soft_expiry, hard_expiry = entry
+                if now >= hard_expiry:
+                    del self._entries[key]
+                else:
+                    self._entries.move_to_end(key)
+                    if now >= soft_expiry:
+                        self.stale_hits += 1
+                        return value, STALE
+                    self.hits += 1
+                    return value, FRESH
+
+        shared = self._lookup_backend(key, now)
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None, MISS
+            self.shared_hits += 1
+            if shared[1] == STALE:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return shared
+
+    def _store(self, key, value, soft_expiry, hard_expiry):
+        with self._lock:
+            self._entries[key] = (value, soft_expiry, hard_expiry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key, value):
+        now = self._clock()
+        self._store(key, value, now + self.soft_ttl, now + self.hard_ttl)
+        if self.backend is not None:
+            self.backend.set(self._backend_key(key), value, self.soft_ttl, self.hard_ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(self._backend_key(key))
+
+    def needs_refresh(self, key, within):
+        """True if key is absent locally or goes stale within 'within' seconds. Not counted as a lookup."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is None or entry[1] - self._clock() <= within
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def begin_refresh(self, key):
+        """Claims the refresh of a key. Returns False if one is already running."""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def end_refresh(self, key, value):
+        """Stores a refreshed value (None keeps the stale one) and releases the claim."""
+        with self._lock:
+            self._refreshing.discard(key)
+            if value is None:
+                self.refresh_failures += 1
+            else:
+                self.refreshes += 1
+        if value is not None:
+            self.set(key, value)
+
+    def _refresh(self, key, loader):
+        value = None
+        try:
+            value = loader()
+        except Exception as e:
+            print(f"Cache Refresh Error ({self.name}, {key}): {e}")
+        finally:
+            self.end_refresh(key, value)
+        return value
+
+    def get_or_load(self, key, loader):
+        """
+        Returns the cached value for key, calling loader() on a miss. Stale
+        values are returned immediately while loader() refreshes them in the
+        background. A loader result of None is treated as a failure and is
+        never cached.
+        """
+        value, state = self.lookup(key)
+        if state == FRESH:
+            return value
+        if state == STALE:
+            if self.begin_refresh(key):
+                if self._schedule:
+                    try:
+                        self._schedule(self._refresh, key, loader)
+                    except Exception as e:
+                        print(f"Cache Refresh Error ({self.name}, {key}): {e}")
+                        self.end_refresh(key, None)
+                else:
+                    self._refresh(key, loader)
+            return value
+
+        value = loader()
+        if value is not None:
+            self.set(key, value)
+        return value
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name, 'size': len(self._entries), 'max_entries': self.max_entries,
+                'hits': self.hits, 'stale_hits': self.stale_hits, 'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'evictions': self.evictions, 'refreshes': self.refreshes,
+                'refresh_failures': self.refresh_failures
+            }
+
+
+class ChangeTracker:
+    """
+    Remembers the last value recorded per key (bounded LRU, entries expire
+    after 'ttl' seconds) so background writers can skip values that have not
+    changed since this worker last wrote them.
+    """
+
+    def __init__(self, max_entries=10000, ttl=3600, clock=time.time):
+        self._clock = clock
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()  # key -> (value, expiry)
+        self._lock = threading.Lock()
+
+    def changed(self, key, value):
+        """Records value for key and returns True unless it equals the unexpired last one."""
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == value and now < entry[1]:
+                self._entries.move_to_end(key)
+                return False
+            self._entries[key] = (value, now + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
@@ -0,0 +1,134 @@
+# ==============================================================================
+# Background Cache Warmer
+# ------------------------------------------------------------------------------
+# This file keeps the LeetCode caches warm for people who are actually using
+# the site. Every request records the logged-in username, and a background
+# thread periodically refreshes those users' snapshots (and their friends'
+# stats) shortly before the cached copies go stale, while staying within
+# a fixed budget of upstream requests per minute.
+# ==============================================================================
+
+import threading
+import time
+from collections import OrderedDict
+from app.services import firebase_service, leetcode_api, solved_index
+
+
+class CacheWarmer:
+    def __init__(self, app):
+        self.app = app
+        self.interval = app.config['CACHE_WARMER_INTERVAL']
+        self.active_window = app.config['CACHE_WARMER_ACTIVE_WINDOW']
+        self.max_users = app.config['CACHE_WARMER_MAX_USERS']
+        self.budget_per_minute = app.config['CACHE_WARMER_BUDGET_PER_MINUTE']
+        self.friends_ttl = app.config['CACHE_WARMER_FRIENDS_TTL']
+        self._active_users = OrderedDict()  # username -> last seen, oldest first
+        self._friends = {}  # active username -> (friend list, fetched at)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._budget_window_start = time.time()
+        self._budget_used = 0
+        self.runs = self.refreshed = self.skipped = self.errors = 0
+
+    def touch(self, username):
+        """Records that username was just active and starts the thread on first use."""
+        if not username:
+            return
+        with self._lock:
+            self._active_users[username] = time.time()
+            self._active_users.move_to_end(username)
+            while len(self._active_users) > self.max_users:
+                self._active_users.popitem(last=False)
+            if self._thread is None:
+                # Started lazily so the thread is created inside the gunicorn worker.
+                self._thread = threading.Thread(target=self._run, name='cache-warmer', daemon=True)
+                self._thread.start()
+
+    def _recent_users(self):
+        cutoff = time.time() - self.active_window
+        with self._lock:
+            for username in [u for u, seen in self._active_users.items() if seen < cutoff]:
+                del self._active_users[username]
+            return list(reversed(self._active_users.keys()))
+
+    def _has_budget(self):
+        """True if the per-minute budget still allows another upstream request."""
+        now = time.time()
+        if now - self._budget_window_start >= 60:
+            self._budget_window_start = now
+            self._budget_used = 0
+        return self._budget_used < self.budget_per_minute
+
+    def _spend(self, refresh, *args):
+        """Runs a refresh and charges the budget for every upstream request it really sent."""
+        sent_before = leetcode_api.upstream_requests_sent()
+        try:
+            return refresh(*args)
+        finally:
+            self._budget_used += leetcode_api.upstream_requests_sent() - sent_before
+
+    def _friends_of(self, usernames):
+        """Friend lists of the active users, re-read from Firestore only every CACHE_WARMER_FRIENDS_TTL."""
+        now = time.time()
+        self._friends = {u: entry for u, entry in self._friends.items() if u in usernames}
+        friends = []
+        for username in usernames:
+            entry = self._friends.get(username)
+            if entry is None or now - entry[1] >= self.friends_ttl:
+                entry = (firebase_service.get_friends(username), now)
+                self._friends[username] = entry
+            friends.extend(entry[0])
+        return friends
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                with self.app.app_context():
+                    self.run_once()
+            except Exception as e:
+                self.errors += 1
+                print(f"Cache Warmer Error: {e}")
+
+    def run_once(self):
+        """Refreshes cache entries of active users and their friends that are about to go stale."""
+        self.runs += 1
+        # Anything that would go stale before the next pass is refreshed now.
+        within = self.interval * 1.5
+        active_users = self._recent_users()
+
+        # Active users first, so they win over friends when the budget runs out.
+        # One snapshot request refreshes their stats and submissions together.
+        for username in active_users:
+            if not leetcode_api.snapshot_needs_refresh(username, within):
+                continue
+            if self._has_budget():
+                self._spend(leetcode_api.refresh_user_snapshot, username)
+                self.refreshed += 1
+                # Fold the fresh submissions into the stored index (and challenge progress)
+                solved_index.sync_user(username)
+            else:
+                self.skipped += 1
+
+        active = set(active_users)
+        stats_candidates = [u for u in dict.fromkeys(self._friends_of(active))
+                            if u not in active and leetcode_api.stats_need_refresh(u, within)]
+
+        batch_size = self.app.config['LEETCODE_BATCH_SIZE']
+        for i in range(0, len(stats_candidates), batch_size):
+            chunk = stats_candidates[i:i + batch_size]
+            # Usually one aliased GraphQL request, but a failed chunk falls back to one per user.
+            if self._has_budget():
+                self._spend(leetcode_api.refresh_user_stats, chunk)
+                self.refreshed += len(chunk)
+            else:
+                self.skipped += len(chunk)
+
+    def stats(self):
+        with self._lock:
+            active = len(self._active_users)
+        return {
+            'active_users': active, 'runs': self.runs, 'refreshed': self.refreshed,
+            'skipped': self.skipped, 'errors': self.errors,
+            'budget_per_minute': self.budget_per_minute, 'budget_used': self._budget_used
+        }
@@ -0,0 +1,96 @@
+# ==============================================================================
+# Materialized Challenge Progress
+# ------------------------------------------------------------------------------
+# This file maintains a 'progress_summary' on every challenge document: each
+# participant's solved count plus the completed / in-progress / invited
+# buckets the challenges page shows. The summary is updated when a
+# participant's solved set changes or the challenge itself changes, so
+# rendering the page only has to read it.
+# ==============================================================================
+
+from app.services import firebase_service, solved_index
+from app.services.problem_index import problems_bitset
+
+
+def calculate_progress(solved_slugs, challenge_problems):
+    """Counts how many of a challenge's problems appear in a user's SolvedSet."""
+    if not solved_slugs or not challenge_problems: return 0
+    return solved_slugs.count_common(problems_bitset(challenge_problems))
+
+
+def _derive_summary(challenge, counts):
+    """Builds the stored summary from per-participant solved counts."""
+    total_count = len(challenge.get('problems', []))
+    completed, inprogress, invited = [], [], []
+    for name, data in challenge.get('participants', {}).items():
+        status = data.get('status')
+        if status == 'accepted':
+            if counts.get(name, 0) >= total_count:
+                completed.append(name)
+            else:
+                inprogress.append(name)
+        elif status == 'invited':
+            invited.append(name)
+
+    return {
+        'counts': counts,
+        'total_problems': total_count,
+        'participants_completed': completed,
+        'participants_inprogress': inprogress,
+        'participants_invited': invited,
+        'accepted_count': len(completed) + len(inprogress),
+        'is_fully_completed': bool(completed or inprogress) and not inprogress and not invited
+    }
+
+
+def build_summary(challenge):
+    """Computes a full summary from every participant's stored solved index."""
+    problems = challenge.get('problems', [])
+    solved_by_user = solved_index.get_stored_solved_many(challenge.get('participants', {}).keys())
+    counts = {name: calculate_progress(solved, problems) for name, solved in solved_by_user.items()}
+    return _derive_summary(challenge, counts)
+
+
+def refresh_challenge(challenge_id):
+    """Recomputes a challenge's summary after the challenge itself changed."""
+    return firebase_service.update_challenge_progress(challenge_id, build_summary)
+
+
+def refresh_buckets(challenge_id):
+    """Re-buckets participants from the stored counts, e.g. after someone accepts or declines."""
+    def mutate(challenge):
+        summary = challenge.get('progress_summary')
+        if not summary:
+            return build_summary(challenge)
+        return _derive_summary(challenge, summary.get('counts', {}))
+    return firebase_service.update_challenge_progress(challenge_id, mutate)
+
+
+def apply_solved_update(username, solved_slugs):
+    """Updates the user's count on every challenge they take part in after their solved set grew."""
+    for challenge in firebase_service.get_user_challenges(username):
+        problems = challenge.get('problems', [])
+        new_count = calculate_progress(solved_slugs, problems)
+        summary = challenge.get('progress_summary') or {}
+        if summary and summary.get('counts', {}).get(username) == new_count:
+            continue
+
+        def mutate(current, new_count=new_count):
+            current_summary = current.get('progress_summary')
+            if not current_summary:
+                return build_summary(current)
+            counts = dict(current_summary.get('counts', {}))
+            if counts.get(username) == new_count:
+                return None
+            counts[username] = new_count
+            return _derive_summary(current, counts)
+
+        firebase_service.update_challenge_progress(challenge['id'], mutate)
+
+
+def get_summary(challenge):
+    """Returns the stored summary, materializing it first for challenges created before it existed."""
+    summary = challenge.get('progress_summary')
+    if summary is None:
+        summary = refresh_challenge(challenge['id']) or build_summary(challenge)
+    return summary
@@ -2,64 +2,175 @@
 # Email Sending Service
 # ------------------------------------------------------------------------------
 # This file handles all logic for sending emails, such as OTPs for
-# verification and password resets.
+# verification and password resets, plus challenge notifications. Messages
+# are handed to the background mail queue when it is enabled, so requests
+# never wait on SMTP, and notifications to many people share one SMTP session.
 # ==============================================================================
 
+import datetime
 import traceback
 from flask_mail import Message
-from flask import current_app # Import current_app
+from flask import current_app, url_for
+from app.services import background_jobs, firebase_service, solved_index
 
 # DO NOT import mail from app here. We will get it from the app context.
 
-def send_otp_email(to_email, otp):
-    """Sends an email with the OTP for verification."""
+def _deliver(msg, description):
+    """Queues a message for background delivery, or sends it inline if the queue is disabled."""
     try:
+        mail_queue = current_app.config.get('MAIL_QUEUE')
+        if mail_queue:
+            return mail_queue.enqueue(msg, description)
+
         # Get the initialized mail object from the current application context.
         mail = current_app.extensions.get('mail')
         if not mail:
             # This is a fallback check in case initialization failed.
             print("CRITICAL ERROR: Mail extension not found on current_app.")
             return False
-
-        msg = Message(
-            subject='Your Progex Verification Code',
-            sender=('Progex', current_app.config['MAIL_DEFAULT_SENDER']),
-            recipients=[to_email]
-        )
-        msg.body = f'Your verification code for Progex is: {otp}\n\nThis code will expire in 10 minutes.'
-        
         mail.send(msg)
-        print(f"INFO: Successfully processed send_otp_email for {to_email}")
+        print(f"INFO: Successfully processed {description}")
         return True
     except Exception as e:
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print(f"ERROR: FAILED TO SEND VERIFICATION EMAIL to {to_email}")
+        print(f"ERROR: FAILED TO SEND {description}")
         traceback.print_exc()
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
         return False
 
-def send_password_reset_email(to_email, otp):
-    """Sends an email with the OTP for password reset."""
+def _deliver_batch(messages, description):
+    """Sends several messages over a single SMTP session (queued, or inline if the queue is disabled)."""
+    if not messages:
+        return True
     try:
-        # Get the initialized mail object from the current application context.
+        mail_queue = current_app.config.get('MAIL_QUEUE')
+        if mail_queue:
+            return mail_queue.enqueue(messages, description)
+
         mail = current_app.extensions.get('mail')
         if not mail:
             print("CRITICAL ERROR: Mail extension not found on current_app.")
             return False
-
-        msg = Message(
-            subject='Your Progex Password Reset Code',
-            sender=('Progex', current_app.config['MAIL_DEFAULT_SENDER']),
-            recipients=[to_email]
-        )
-        msg.body = f'Your password reset code for Progex is: {otp}\n\nThis code will expire in 10 minutes. If you did not request this, you can safely ignore this email.'
-        
-        mail.send(msg)
-        print(f"INFO: Successfully processed send_password_reset_email for {to_email}")
+        with mail.connect() as connection:
+            for msg in messages:
+                connection.send(msg)
+        print(f"INFO: Successfully processed {description}")
         return True
     except Exception as e:
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        print(f"ERROR: FAILED TO SEND PASSWORD RESET EMAIL to {to_email}")
+        print(f"ERROR: FAILED TO SEND {description}")
         traceback.print_exc()
         print("!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!!")
-        return False
\ No newline at end of file
+        return False
+
+def _emails_by_username(usernames):
+    """Looks up many users' email addresses in one batched read."""
+    return {
+        username: user_data['email']
+        for username, user_data in zip(usernames, firebase_service.get_users_data(usernames))
+        if user_data and user_data.get('email')
+    }
+
+def send_otp_email(to_email, otp):
+    """Sends an email with the OTP for verification."""
+    msg = Message(
+        subject='Your Progex Verification Code',
+        sender=('Progex', current_app.config['MAIL_DEFAULT_SENDER']),
+        recipients=[to_email]
+    )
+    msg.body = f'Your verification code for Progex is: {otp}\n\nThis code will expire in 10 minutes.'
+    return _deliver(msg, f"verification email to {to_email}")
+
+def send_password_reset_email(to_email, otp):
+    """Sends an email with the OTP for password reset."""
+    msg = Message(
+        subject='Your Progex Password Reset Code',
+        sender=('Progex', current_app.config['MAIL_DEFAULT_SENDER']),
+        recipients=[to_email]
+    )
+    msg.body = f'Your password reset code for Progex is: {otp}\n\nThis code will expire in 10 minutes. If you did not request this, you can safely ignore this email.'
+    return _deliver(msg, f"password reset email to {to_email}")
+
+def send_challenge_invitations(challenge_id, challenge, usernames):
+    """Emails everyone invited to a new challenge, all over one SMTP session."""
+    window = current_app.config['NOTIFICATION_DEDUP_WINDOWS']['challenge_invite']
+    recipients = [username for username, _ in firebase_service.claim_notifications(
+        [(username, challenge_id) for username in usernames], 'challenge_invite', window
+    )]
+    emails = _emails_by_username(recipients)
+    link = url_for('challenges.challenges_page', _external=True)
+    sender = ('Progex', current_app.config['MAIL_DEFAULT_SENDER'])
+    messages = []
+    for username in recipients:
+        if username not in emails:
+            continue
+        msg = Message(
+            subject=f"{challenge['creatorUsername']} challenged you on Progex",
+            sender=sender,
+            recipients=[emails[username]]
+        )
+        msg.body = (f"Hi {username},\n\n{challenge['creatorUsername']} invited you to the challenge "
+                    f"\"{challenge['title']}\" ({len(challenge.get('problems', []))} problems).\n\n"
+                    f"Accept or decline it here: {link}")
+        messages.append(msg)
+    return _deliver_batch(messages, f"{len(messages)} invitation emails for challenge {challenge_id}")
+
+def send_expiring_challenge_digests(link):
+    """
+    Sends each participant one digest of their unfinished challenges that
+    expire soon, all over one SMTP session. Meant to be run periodically
+    (see start_expiring_challenge_digests). 'link' is the challenges page URL.
+    """
+    config = current_app.config
+    horizon = datetime.timedelta(hours=config['CHALLENGE_DIGEST_HORIZON_HOURS'])
+    expiring = firebase_service.get_expiring_challenges(horizon)
+    # Unfinished participants are re-synced first, so nobody is nagged about problems they already solved
+    unfinished = {username for challenge in expiring
+                  for username in (challenge.get('progress_summary') or {}).get('participants_inprogress', [])}
+    if solved_index.sync_users(unfinished):
+        expiring = firebase_service.get_expiring_challenges(horizon)
+    expiring_by_user = {}
+    for challenge in expiring:
+        summary = challenge.get('progress_summary') or {}
+        # Only people who still have something to do: unfinished or not yet answered
+        for username in summary.get('participants_inprogress', []) + summary.get('participants_invited', []):
+            expiring_by_user.setdefault(username, []).append(challenge)
+
+    # Each challenge is mentioned to each participant once per window
+    claimed = firebase_service.claim_notifications(
+        [(username, challenge['id']) for username, challenges in expiring_by_user.items() for challenge in challenges],
+        'expiring_digest', config['NOTIFICATION_DEDUP_WINDOWS']['expiring_digest']
+    )
+    expiring_by_id = {challenge['id']: challenge for challenges in expiring_by_user.values() for challenge in challenges}
+    due_by_user = {}
+    for username, challenge_id in claimed:
+        due_by_user.setdefault(username, []).append(expiring_by_id[challenge_id])
+    recipients = list(due_by_user)
+    emails = _emails_by_username(recipients)
+    sender = ('Progex', config['MAIL_DEFAULT_SENDER'])
+    messages = []
+    for username in recipients:
+        if username not in emails:
+            continue
+        lines = [
+            f"- {challenge['title']} (expires {challenge['expiresAt'].strftime('%Y-%m-%d %H:%M')} UTC)"
+            for challenge in sorted(due_by_user[username], key=lambda c: c['expiresAt'])
+        ]
+        msg = Message(
+            subject='Your Progex challenges are about to expire',
+            sender=sender,
+            recipients=[emails[username]]
+        )
+        msg.body = (f"Hi {username},\n\nThese challenges expire soon:\n\n" + "\n".join(lines) +
+                    f"\n\nFinish them here: {link}")
+        messages.append(msg)
+
+    if not _deliver_batch(messages, f"{len(messages)} expiring challenge digests"):
+        return "An error occurred while sending the expiring challenge digests."
+    return f"Queued expiring challenge digests for {len(messages)} users."
+
+def start_expiring_challenge_digests():
+    """Starts the digest run in the background; returns False if it is already running in this worker."""
+    # The link is built here: background threads have no request to build external URLs from
+    link = url_for('challenges.challenges_page', _external=True)
+    return background_jobs.start('expiring_challenge_digests', send_expiring_challenge_digests, link)
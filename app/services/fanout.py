@@ -0,0 +1,106 @@
+# ==============================================================================
+# Concurrent Fan-out Service
+# ------------------------------------------------------------------------------
+# This file runs many independent lookups (usually one LeetCode call per user)
+# in parallel on a shared, bounded thread pool, so a page that needs data for
+# many participants waits for the slowest call instead of the sum of all calls.
+# Fire-and-forget background work (cache refreshes, derived-data writes) runs
+# on a second, smaller pool so it never queues ahead of a page's fan-out.
+# ==============================================================================
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from flask import current_app
+
+_executor = None
+_background_executor = None
+_executor_lock = threading.Lock()
+# Marks pool threads so nested fan-outs run inline instead of deadlocking the pool.
+_worker_state = threading.local()
+
+
+def _get_executor():
+    """Lazily creates the per-worker pool, sized by LEETCODE_MAX_CONCURRENCY."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=current_app.config['LEETCODE_MAX_CONCURRENCY'],
+                    thread_name_prefix='fanout'
+                )
+    return _executor
+
+
+def _get_background_executor():
+    """Lazily creates the per-worker background pool, sized by BACKGROUND_MAX_WORKERS."""
+    global _background_executor
+    if _background_executor is None:
+        with _executor_lock:
+            if _background_executor is None:
+                _background_executor = ThreadPoolExecutor(
+                    max_workers=current_app.config['BACKGROUND_MAX_WORKERS'],
+                    thread_name_prefix='background'
+                )
+    return _background_executor
+
+
+def _run_in_app_context(app, func, args):
+    _worker_state.active = True
+    try:
+        with app.app_context():
+            return func(*args)
+    finally:
+        _worker_state.active = False
+
+
+def _submit(func, *args):
+    app = current_app._get_current_object()
+    return _get_executor().submit(_run_in_app_context, app, func, args)
+
+
+def submit_background(func, *args):
+    """
+    Schedules func(*args) on the background pool inside an app context and
+    returns the Future. Used for fire-and-forget work such as cache refreshes;
+    fan-outs nested inside it run inline on that background thread.
+    """
+    app = current_app._get_current_object()
+    return _get_background_executor().submit(_run_in_app_context, app, func, args)
+
+
+def fan_out(func, keys, default=None, timeout=None):
+    """
+    Calls func(key) for every unique key concurrently and returns a dict of
+    {key: result}. A key whose call raises, or does not finish within
+    'timeout' seconds, maps to 'default' instead.
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+
+    # Inside a pool thread (or for a single key) just run the calls inline.
+    if len(unique_keys) == 1 or getattr(_worker_state, 'active', False):
+        results = {}
+        for key in unique_keys:
+            try:
+                results[key] = func(key)
+            except Exception as e:
+                print(f"Fan-out Error for {key}: {e}")
+                results[key] = default
+        return results
+
+    futures = {_submit(func, key): key for key in unique_keys}
+    done, not_done = wait(futures, timeout=timeout)
+
+    results = dict.fromkeys(unique_keys, default)
+    for future in done:
+        key = futures[future]
+        try:
+            results[key] = future.result()
+        except Exception as e:
+            print(f"Fan-out Error for {key}: {e}")
+    for future in not_done:
+        future.cancel()
+        print(f"Fan-out Timeout for {futures[future]}")
+    return results
@@ -5,30 +5,164 @@
 # This version includes the new, automatic seeder for the NeetCode 150 plan.
 # ==============================================================================
 
-from flask import current_app
+from flask import current_app, g, has_app_context
 from firebase_admin import firestore
 from google.cloud.firestore_v1.base_query import FieldFilter
 from werkzeug.security import generate_password_hash
+from app.services.cache import TTLCache
+import copy
 import datetime
+import threading
+import time
 
 # This helper function makes the code cleaner by getting the db connection
 def _get_db():
     return current_app.config['DB']
 
+# --- Request-Scoped Identity Map ---
+# Within one request (one app context), each document is read from Firestore
+# at most once. The map lives on flask.g, so it never outlives the request,
+# and every write made through this service forgets the documents it touched.
+def _identity_map():
+    if not has_app_context():
+        return None
+    if 'firestore_identity_map' not in g:
+        g.firestore_identity_map = {}
+    return g.firestore_identity_map
+
+def _remember_document(collection, doc_id, data):
+    identity_map = _identity_map()
+    if identity_map is not None:
+        identity_map[(collection, doc_id)] = data
+
+def _read_document(collection, doc_id):
+    """Returns a copy of the document's data (or None), reading it at most once per request."""
+    identity_map = _identity_map()
+    key = (collection, doc_id)
+    if identity_map is not None and key in identity_map:
+        data = identity_map[key]
+    else:
+        doc = _get_db().collection(collection).document(doc_id).get()
+        data = doc.to_dict() if doc.exists else None
+        _remember_document(collection, doc_id, data)
+    # Callers may mutate what they get back, so never hand out the shared copy
+    return copy.deepcopy(data)
+
+# Documents fetched per db.get_all call when reading in bulk
+GET_ALL_CHUNK_SIZE = 100
+
+def _read_documents(collection, doc_ids):
+    """
+    Bulk version of _read_document built on db.get_all. Returns a list of
+    document data (or None) in the same order as doc_ids.
+    """
+    identity_map = _identity_map()
+    found, missing = {}, []
+    for doc_id in dict.fromkeys(d for d in doc_ids if d):
+        key = (collection, doc_id)
+        if identity_map is not None and key in identity_map:
+            found[doc_id] = identity_map[key]
+        else:
+            missing.append(doc_id)
+
+    db = _get_db()
+    for i in range(0, len(missing), GET_ALL_CHUNK_SIZE):
+        refs = [db.collection(collection).document(doc_id) for doc_id in missing[i:i + GET_ALL_CHUNK_SIZE]]
+        for doc in db.get_all(refs):
+            data = doc.to_dict() if doc.exists else None
+            found[doc.id] = data
+            _remember_document(collection, doc.id, data)
+
+    return [copy.deepcopy(found.get(doc_id)) for doc_id in doc_ids]
+
+def _forget_documents(collection, *doc_ids):
+    identity_map = _identity_map()
+    if identity_map is not None:
+        for doc_id in doc_ids:
+            identity_map.pop((collection, doc_id), None)
+
+def _transactional_update(doc_ref, mutate):
+    """
+    Read-modify-write of one document inside a transaction. 'mutate' receives
+    the current data (None if the document does not exist) and returns the new
+    document, or None to leave it untouched. Returns the stored document (the
+    current one when untouched). Errors are left to the caller.
+    """
+    db = _get_db()
+
+    @firestore.transactional
+    def update_in_transaction(transaction):
+        snapshot = doc_ref.get(transaction=transaction)
+        current = snapshot.to_dict() if snapshot.exists else None
+        data = mutate(current)
+        if data is None:
+            return current
+        transaction.set(doc_ref, data)
+        return data
+
+    try:
+        return update_in_transaction(db.transaction())
+    finally:
+        _forget_documents(doc_ref.parent.id, doc_ref.id)
+
+# --- Shared Cache Helpers ---
+# When SHARED_CACHE_PATH is configured, slow-changing reads go through the
+# host-wide cache so every worker can reuse them. Writes invalidate the keys.
+FRIENDS_CACHE_TTL = 300
+
+def _cached_read(key, ttl, loader):
+    cache = current_app.config.get('SHARED_CACHE')
+    if cache is None:
+        return loader()
+    entry = cache.get(key)
+    if entry is not None:
+        return entry[0]
+    value = loader()
+    if value is not None:
+        cache.set(key, value, ttl, ttl)
+    return value
+
+def _invalidate_cached_reads(*keys):
+    cache = current_app.config.get('SHARED_CACHE')
+    if cache is not None:
+        for key in keys:
+            cache.delete(key)
+
+def _friends_cache_key(username):
+    return f"firestore:friends:{username}"
+
+# Per-user pending friend request counts for the navbar dot. Writes in this
+# worker invalidate immediately; other workers pick changes up within the TTL.
+PENDING_COUNT_CACHE_TTL = 60
+_pending_count_cache = None
+_pending_count_lock = threading.Lock()
+
+def _get_pending_count_cache():
+    global _pending_count_cache
+    if _pending_count_cache is None:
+        with _pending_count_lock:
+            if _pending_count_cache is None:
+                _pending_count_cache = TTLCache('pending_requests', PENDING_COUNT_CACHE_TTL, PENDING_COUNT_CACHE_TTL,
+                                                4096, backend=current_app.config.get('SHARED_CACHE'))
+    return _pending_count_cache
+
 # --- User & Authentication Functions ---
 def get_user_data(username):
     if not username: return None
-    db = _get_db()
-    doc_ref = db.collection('users').document(username)
-    doc = doc_ref.get()
-    return doc.to_dict() if doc.exists else None
+    return _read_document('users', username)
+
+def get_users_data(usernames):
+    """Fetches many user documents in as few round trips as possible, in the given order."""
+    return _read_documents('users', usernames)
 
 def get_user_by_email(email):
     db = _get_db()
     users_ref = db.collection('users').where(filter=FieldFilter('email', '==', email)).limit(1)
     docs = users_ref.stream()
     for doc in docs:
-        return doc.to_dict()
+        user_data = doc.to_dict()
+        _remember_document('users', doc.id, user_data)
+        return copy.deepcopy(user_data)
     return None
 
 def create_unverified_user(username, email, otp):
@@ -39,6 +173,7 @@ def create_unverified_user(username, email, otp):
         'leetcode_username': username, 'email': email, 'is_verified': False,
         'otp': otp, 'otp_expires': expiration
     })
+    _forget_documents('users', username)
 
 def verify_user_and_set_password(username, password_hash):
     db = _get_db()
@@ -47,12 +182,14 @@ def verify_user_and_set_password(username, password_hash):
         'password_hash': password_hash, 'is_verified': True,
         'otp': firestore.DELETE_FIELD, 'otp_expires': firestore.DELETE_FIELD
     })
+    _forget_documents('users', username)
 
 def set_password_reset_otp(username, otp):
     db = _get_db()
     user_ref = db.collection('users').document(username)
     expiration = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(minutes=10)
     user_ref.update({'reset_otp': otp, 'reset_otp_expires': expiration})
+    _forget_documents('users', username)
 
 def reset_password(username, new_password_hash):
     db = _get_db()
@@ -61,11 +198,14 @@ def reset_password(username, new_password_hash):
         'password_hash': new_password_hash,
         'reset_otp': firestore.DELETE_FIELD, 'reset_otp_expires': firestore.DELETE_FIELD
     })
+    _forget_documents('users', username)
 
 def delete_user_account(username):
     db = _get_db()
     try:
         db.collection('users').document(username).delete()
+        _forget_documents('users', username)
+        _invalidate_cached_reads(_friends_cache_key(username))
         return True
     except Exception as e:
         print(f"Error deleting user {username}: {e}")
@@ -77,6 +217,9 @@ def add_friend(main_username, friend_username):
     db = _get_db()
     user_ref = db.collection('users').document(main_username)
     user_ref.update({'friends': firestore.ArrayUnion([friend_username])})
+    _forget_documents('users', main_username)
+    _invalidate_cached_reads(_friends_cache_key(main_username))
+    mark_leaderboard_stale(main_username)
     return True
 
 def remove_friend(main_username, friend_username):
@@ -84,31 +227,74 @@ def remove_friend(main_username, friend_username):
     db = _get_db()
     user_ref = db.collection('users').document(main_username)
     user_ref.update({'friends': firestore.ArrayRemove([friend_username])})
+    _forget_documents('users', main_username)
+    _invalidate_cached_reads(_friends_cache_key(main_username))
+    mark_leaderboard_stale(main_username)
     return True
 
 def get_friends(main_username):
-    user_data = get_user_data(main_username)
-    return user_data.get('friends', []) if user_data else []
+    def load():
+        user_data = get_user_data(main_username)
+        return user_data.get('friends', []) if user_data else []
+    return _cached_read(_friends_cache_key(main_username), FRIENDS_CACHE_TTL, load)
+
+
+# --- Leaderboard Functions ---
+def get_leaderboard(username):
+    """Fetches a user's materialized friends leaderboard (a single document)."""
+    return _read_document('leaderboards', username)
+
+def update_leaderboard(username, mutate):
+    """
+    Rewrites a user's leaderboard document inside a transaction. 'mutate'
+    receives the current data (None if there is none yet) and returns the new
+    document, or None to leave it untouched. Returns the stored document.
+    """
+    try:
+        return _transactional_update(_get_db().collection('leaderboards').document(username), mutate)
+    except Exception as e:
+        print(f"Error updating leaderboard for {username}: {e}")
+        return None
+
+def get_leaderboard_owners(username):
+    """Lists the users whose stored leaderboard includes username (one index-backed query)."""
+    db = _get_db()
+    query = db.collection('leaderboards').where(
+        filter=FieldFilter('members', 'array_contains', username)
+    ).select([])
+    return [doc.id for doc in query.stream()]
+
+def mark_leaderboard_stale(username):
+    """Flags a leaderboard for a membership rebuild after the user's friend list changed."""
+    db = _get_db()
+    db.collection('leaderboards').document(username).set({'needs_rebuild': True}, merge=True)
+    _forget_documents('leaderboards', username)
 
 
 # --- Challenge Functions ---
 def create_challenge(challenge_data):
     db = _get_db()
+    # Denormalized list of participant names so get_user_challenges can use array-contains
+    challenge_data.setdefault('participant_usernames', sorted(challenge_data.get('participants', {})))
     try:
-        db.collection('challenges').add(challenge_data)
-        return True
+        _, doc_ref = db.collection('challenges').add(challenge_data)
+        return doc_ref.id
     except Exception as e:
         print(f"Error creating challenge: {e}")
-        return False
+        return None
 
 def get_user_challenges(username):
     db = _get_db()
-    challenges_ref = db.collection('challenges').where(filter=FieldFilter('status', '==', 'active'))
+    # Only the user's own challenges are read; the status check stays in Python
+    # so the query doesn't need a composite index.
+    challenges_ref = db.collection('challenges').where(
+        filter=FieldFilter('participant_usernames', 'array_contains', username)
+    )
     docs = challenges_ref.stream()
     user_challenges = []
     for doc in docs:
         challenge_data = doc.to_dict()
-        if username in challenge_data.get('participants', {}):
+        if challenge_data.get('status') == 'active' and username in challenge_data.get('participants', {}):
             challenge_data['id'] = doc.id
             user_challenges.append(challenge_data)
     return user_challenges
@@ -117,54 +303,131 @@ def update_challenge_participant_status(challenge_id, username, new_status):
     db = _get_db()
     challenge_ref = db.collection('challenges').document(challenge_id)
     challenge_ref.update({f'participants.{username}.status': new_status})
+    _forget_documents('challenges', challenge_id)
     return True
 
 def delete_challenge(challenge_id):
     db = _get_db()
     try:
         db.collection('challenges').document(challenge_id).delete()
+        _forget_documents('challenges', challenge_id)
         return True
     except Exception as e:
         print(f"Error deleting challenge {challenge_id}: {e}")
         return False
 
 def get_challenge_by_id(challenge_id):
-    db = _get_db()
-    doc = db.collection('challenges').document(challenge_id).get()
-    if doc.exists:
-        challenge_data = doc.to_dict()
-        challenge_data['id'] = doc.id
-        return challenge_data
-    return None
+    challenge_data = _read_document('challenges', challenge_id)
+    if challenge_data is not None:
+        challenge_data['id'] = challenge_id
+    return challenge_data
+
+def get_challenges_by_ids(challenge_ids):
+    """Fetches many challenge documents at once, in the given order (None for missing ones)."""
+    challenges = _read_documents('challenges', challenge_ids)
+    for challenge_id, challenge_data in zip(challenge_ids, challenges):
+        if challenge_data is not None:
+            challenge_data['id'] = challenge_id
+    return challenges
 
 def update_challenge_details(challenge_id, updated_data):
     db = _get_db()
     try:
         db.collection('challenges').document(challenge_id).update(updated_data)
+        _forget_documents('challenges', challenge_id)
         return True
     except Exception as e:
         print(f"Error updating challenge {challenge_id}: {e}")
         return False
 
+def update_challenge_progress(challenge_id, mutate):
+    """
+    Rewrites a challenge's materialized 'progress_summary' inside a transaction.
+    'mutate' receives the current challenge data and returns the new summary,
+    or None to leave the document untouched. Returns the stored summary.
+    """
+    def mutate_challenge(challenge):
+        if challenge is None:
+            return None
+        summary = mutate(challenge)
+        return None if summary is None else {**challenge, 'progress_summary': summary}
+
+    try:
+        challenge = _transactional_update(_get_db().collection('challenges').document(challenge_id), mutate_challenge)
+        return (challenge or {}).get('progress_summary')
+    except Exception as e:
+        print(f"Error updating progress for challenge {challenge_id}: {e}")
+        return None
+
 # --- Study Plan Functions ---
+# The question list only changes when the plan is reseeded, so each worker
+# keeps it in memory and only re-checks the version stamp every few minutes.
+STUDY_PLAN_VERSION_CHECK_INTERVAL = 300
+_study_plan = None
+_study_plan_lock = threading.Lock()
+
+def _get_study_plan_version():
+    db = _get_db()
+    doc = db.collection('meta').document('study_plan').get()
+    return doc.to_dict().get('version', 0) if doc.exists else 0
+
+def _load_study_plan(version):
+    # problem_index imports this module at load time, so import it lazily here
+    from app.services.problem_index import problems_bitset
+    db = _get_db()
+    questions = [doc.to_dict() for doc in db.collection('study_plan_questions').order_by('order').stream()]
+    grouped_questions = {}
+    for question in questions:
+        grouped_questions.setdefault(question.get('topic', 'General'), []).append(question)
+    return {
+        'version': version,
+        'questions': questions,
+        'grouped_questions': grouped_questions,
+        'topic_bitsets': {topic: problems_bitset(topic_questions)
+                          for topic, topic_questions in grouped_questions.items()},
+        'checked_at': time.time()
+    }
+
+def get_study_plan():
+    """
+    Returns the cached study plan: the ordered 'questions' list, the questions
+    grouped by topic and each topic's problem bitset. Treat the result as read-only.
+    """
+    global _study_plan
+    with _study_plan_lock:
+        plan = _study_plan
+        if plan and time.time() - plan['checked_at'] < STUDY_PLAN_VERSION_CHECK_INTERVAL:
+            return plan
+        if plan:
+            # Other requests keep using this copy while we check the version
+            plan['checked_at'] = time.time()
+    # Firestore is read outside the lock, so a slow read never blocks other requests
+    version = _get_study_plan_version()
+    if plan and plan['version'] == version:
+        return plan
+    plan = _load_study_plan(version)
+    # An unseeded plan isn't cached, so seeding takes effect immediately.
+    if plan['questions']:
+        with _study_plan_lock:
+            if _study_plan is None or _study_plan['version'] <= version:
+                _study_plan = plan
+    return plan
+
 def get_study_plan_questions():
     """Fetches the entire list of curated study plan questions, ordered correctly."""
-    db = _get_db()
-    docs = db.collection('study_plan_questions').order_by('order').stream()
-    return [doc.to_dict() for doc in docs]
+    return get_study_plan()['questions']
 
 def get_or_initialize_user_study_plan(username):
     """Gets a user's study plan progress. If it doesn't exist, creates it."""
-    db = _get_db()
-    user_ref = db.collection('users').document(username)
-    user_doc = user_ref.get()
-    if user_doc.exists:
-        user_data = user_doc.to_dict()
+    user_data = get_user_data(username)
+    if user_data:
         if 'study_plan_progress' in user_data:
             return user_data['study_plan_progress']
         else:
             initial_progress = {'current_question_index': 0}
-            user_ref.update({'study_plan_progress': initial_progress})
+            db = _get_db()
+            db.collection('users').document(username).update({'study_plan_progress': initial_progress})
+            _forget_documents('users', username)
             return initial_progress
     return None
 
@@ -173,8 +436,193 @@ def advance_user_study_plan(username, current_index):
     db = _get_db()
     user_ref = db.collection('users').document(username)
     user_ref.update({'study_plan_progress.current_question_index': firestore.Increment(1)})
+    _forget_documents('users', username)
     return True
 
+def backfill_participant_usernames():
+    """
+    One-off migration that adds the 'participant_usernames' array to challenge
+    documents created before it existed. It is idempotent and safe to re-run.
+    """
+    db = _get_db()
+    try:
+        batch = db.batch()
+        pending, updated = 0, 0
+        for doc in db.collection('challenges').stream():
+            challenge_data = doc.to_dict()
+            usernames = sorted(challenge_data.get('participants', {}))
+            if challenge_data.get('participant_usernames') == usernames:
+                continue
+            batch.update(doc.reference, {'participant_usernames': usernames})
+            pending += 1
+            updated += 1
+            # Firestore batches are limited to 500 writes
+            if pending == 500:
+                batch.commit()
+                batch = db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+        return f"Backfilled participant_usernames on {updated} challenges."
+    except Exception as e:
+        print(f"ERROR during participant backfill: {e}")
+        return f"An error occurred during the participant backfill: {e}"
+
+# --- Solved Problem Index Functions ---
+def get_solved_index(username):
+    """Fetches a user's stored set of accepted problem slugs and its high-water mark."""
+    return _read_document('solved_index', username)
+
+def get_solved_indexes(usernames):
+    """Fetches many users' solved indexes at once, in the given order."""
+    return _read_documents('solved_index', usernames)
+
+def update_solved_index(username, new_slugs, high_water_mark):
+    """
+    Adds newly accepted slugs to a user's index inside a transaction. The
+    high-water mark only ever moves forward, so a slower worker finishing an
+    older sync cannot move it back. Returns the stored index, or None on error.
+    """
+    def mutate(current):
+        current = current or {}
+        return {
+            'slugs': sorted(set(current.get('slugs', [])) | set(new_slugs)),
+            'high_water_mark': max(current.get('high_water_mark', 0), high_water_mark),
+            'synced_at': firestore.SERVER_TIMESTAMP
+        }
+
+    try:
+        return _transactional_update(_get_db().collection('solved_index').document(username), mutate)
+    except Exception as e:
+        print(f"Error updating solved index for {username}: {e}")
+        return None
+
+def get_expiring_challenges(within):
+    """
+    Fetches active challenges expiring in the next 'within' (a timedelta).
+    Only expiresAt is filtered in the query, so no composite index is needed.
+    """
+    db = _get_db()
+    now = datetime.datetime.now(datetime.timezone.utc)
+    challenges_ref = db.collection('challenges').where(
+        filter=FieldFilter('expiresAt', '>=', now)
+    ).where(filter=FieldFilter('expiresAt', '<=', now + within))
+    expiring = []
+    for doc in challenges_ref.stream():
+        challenge_data = doc.to_dict()
+        if challenge_data.get('status') == 'active':
+            challenge_data['id'] = doc.id
+            expiring.append(challenge_data)
+    return expiring
+
+# --- Notification Log Functions ---
+def _notification_id(username, kind, subject):
+    return f"{username}:{kind}:{subject}"
+
+def claim_notifications(recipients, kind, window):
+    """
+    Takes (username, subject) pairs, e.g. (invitee, challenge_id), and returns
+    those that have not been sent a 'kind' notification in the last 'window'
+    seconds, marking them as notified now. Every pair has its own small log
+    document whose 'expires_at' lets a Firestore TTL policy delete it once the
+    window has passed. Marks are written before delivery, so a failed send is
+    not repeated (at most once).
+    """
+    recipients = list(dict.fromkeys((username, subject) for username, subject in recipients if username))
+    if not recipients:
+        return []
+    doc_ids = [_notification_id(username, kind, subject) for username, subject in recipients]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    claimed = [
+        (recipient, doc_id)
+        for recipient, doc_id, log in zip(recipients, doc_ids, _read_documents('notification_log', doc_ids))
+        if not log or now - log['sent_at'] >= datetime.timedelta(seconds=window)
+    ]
+    db = _get_db()
+    for i in range(0, len(claimed), 500):
+        batch = db.batch()
+        for (username, subject), doc_id in claimed[i:i + 500]:
+            batch.set(db.collection('notification_log').document(doc_id), {
+                'username': username, 'kind': kind, 'subject': subject,
+                'sent_at': now, 'expires_at': now + datetime.timedelta(seconds=window)
+            })
+        batch.commit()
+    _forget_documents('notification_log', *(doc_id for _, doc_id in claimed))
+    return [recipient for recipient, _ in claimed]
+
+# --- Stat History Functions ---
+def get_stat_histories(doc_ids):
+    """Fetches per-user-per-year snapshot documents, in the given order."""
+    return _read_documents('stat_history', doc_ids)
+
+def update_stat_history(doc_id, mutate):
+    """Rewrites one snapshot document inside a transaction (see _transactional_update)."""
+    try:
+        return _transactional_update(_get_db().collection('stat_history').document(doc_id), mutate)
+    except Exception as e:
+        print(f"Error updating stat history {doc_id}: {e}")
+        return None
+
+# --- Submission Calendar Functions ---
+def get_submission_calendars(doc_ids):
+    """Fetches per-user-per-year submission count documents, in the given order."""
+    return _read_documents('submission_calendar', doc_ids)
+
+def update_submission_calendar(doc_id, mutate):
+    """Rewrites one submission calendar document inside a transaction (see _transactional_update)."""
+    try:
+        return _transactional_update(_get_db().collection('submission_calendar').document(doc_id), mutate)
+    except Exception as e:
+        print(f"Error updating submission calendar {doc_id}: {e}")
+        return None
+
+# --- Global Ranking Functions ---
+# Every ranked user has their own 'ranking_scores/{username}' document holding
+# [total, easy, medium, hard] and the server time of its last change; removed
+# users leave a tombstone so other workers see the removal. 'ranking_index/meta'
+# carries a version that writers bump (debounced) after a change.
+def get_ranking_meta():
+    return _read_document('ranking_index', 'meta')
+
+def get_all_ranking_scores():
+    """Returns [(username, data)] for every score document. Only read when a worker first builds its index."""
+    db = _get_db()
+    return [(doc.id, doc.to_dict()) for doc in db.collection('ranking_scores').stream()]
+
+def get_ranking_changes(since):
+    """Returns [(username, data)] for the score documents changed after 'since', oldest first."""
+    db = _get_db()
+    query = db.collection('ranking_scores').where(
+        filter=FieldFilter('updated_at', '>', since)
+    ).order_by('updated_at')
+    return [(doc.id, doc.to_dict()) for doc in query.stream()]
+
+def write_ranking_scores(scores_by_user):
+    """Writes {username: scores, or None to remove the user} as one document per user."""
+    db = _get_db()
+    usernames = list(scores_by_user)
+    # Firestore batches hold at most 500 writes
+    for i in range(0, len(usernames), 500):
+        batch = db.batch()
+        for username in usernames[i:i + 500]:
+            scores = scores_by_user[username]
+            batch.set(db.collection('ranking_scores').document(username), {
+                'scores': list(scores) if scores is not None else None,
+                'removed': scores is None,
+                'updated_at': firestore.SERVER_TIMESTAMP
+            })
+        batch.commit()
+
+def bump_ranking_version():
+    db = _get_db()
+    db.collection('ranking_index').document('meta').set({'version': firestore.SERVER_TIMESTAMP}, merge=True)
+    _forget_documents('ranking_index', 'meta')
+
+def get_all_usernames():
+    """Lists every registered username (document IDs only, no fields are read)."""
+    db = _get_db()
+    return [doc.id for doc in db.collection('users').select([]).stream()]
+
 # --- Database Seeder ---
 def _create_seed_user(username, email, password):
     db = _get_db()
@@ -186,7 +634,7 @@ def _create_seed_user(username, email, password):
 
 def seed_database():
     db = _get_db()
-    if db.collection('users').document('testuser1').get().exists:
+    if any(get_users_data(['testuser1', 'testuser2'])):
         return "Database has already been seeded. No action taken."
     try:
         _create_seed_user('testuser1', 'testuser1@example.com', 'password123')
@@ -198,7 +646,8 @@ def seed_database():
             'description': 'A test challenge for testuser1.',
             'expiresAt': datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=3),
             'status': 'active', 'problems': [{'title': 'Two Sum', 'titleSlug': 'two-sum'}],
-            'participants': {'testuser2': {'status': 'accepted'}, 'testuser1': {'status': 'invited'}}
+            'participants': {'testuser2': {'status': 'accepted'}, 'testuser1': {'status': 'invited'}},
+            'participant_usernames': ['testuser1', 'testuser2']
         }
         db.collection('challenges').add(challenge1_data)
         return "Database seeded successfully!"
@@ -382,6 +831,7 @@ def create_friend_request(from_user, to_user):
         'timestamp': firestore.SERVER_TIMESTAMP
     }
     db.collection('friend_requests').add(request_data)
+    _get_pending_count_cache().delete(to_user)
     return "Request sent successfully."
 
 def get_pending_requests(username):
@@ -400,6 +850,26 @@ def get_pending_requests(username):
         requests.append(req_data)
     return requests
 
+def get_pending_request_count(username):
+    """
+    Returns how many pending friend requests a user has, using a Firestore
+    count() aggregation so no request documents are downloaded. Cached per user.
+    """
+    def load():
+        db = _get_db()
+        query = db.collection('friend_requests').where(
+            filter=FieldFilter('to_user', '==', username)
+        ).where(
+            filter=FieldFilter('status', '==', 'pending')
+        )
+        try:
+            return query.count().get()[0][0].value
+        except Exception as e:
+            print(f"Error counting friend requests for {username}: {e}")
+            return None
+    count = _get_pending_count_cache().get_or_load(username, load)
+    return count or 0
+
 def accept_friend_request(request_id):
     """Accepts a friend request, adds friends to both users, and deletes the request."""
     db = _get_db()
@@ -425,19 +895,26 @@ def accept_friend_request(request_id):
         
         # Delete the request document now that it's handled
         transaction.delete(request_ref)
+        return from_user, to_user
 
     try:
-        update_in_transaction(db.transaction(), request_ref)
+        from_user, to_user = update_in_transaction(db.transaction(), request_ref)
+        _invalidate_cached_reads(_friends_cache_key(from_user), _friends_cache_key(to_user))
+        _forget_documents('users', from_user, to_user)
+        _get_pending_count_cache().delete(to_user)
+        mark_leaderboard_stale(from_user)
+        mark_leaderboard_stale(to_user)
         return True
     except Exception as e:
         print(f"Error accepting friend request: {e}")
         return False
 
-def reject_friend_request(request_id):
-    """Deletes a friend request document."""
+def reject_friend_request(request_id, to_user):
+    """Deletes a friend request document. 'to_user' is its recipient, the one rejecting it."""
     db = _get_db()
     try:
         db.collection('friend_requests').document(request_id).delete()
+        _get_pending_count_cache().delete(to_user)
         return True
     except Exception as e:
         print(f"Error rejecting friend request: {e}")
@@ -448,6 +925,7 @@ def seed_neetcode_plan():
     Automatically populates the `study_plan_questions` collection with the
     NeetCode list. It is idempotent and will not add duplicates.
     """
+    global _study_plan
     db = _get_db()
     collection_ref = db.collection('study_plan_questions')
     
@@ -463,29 +941,12 @@ def seed_neetcode_plan():
             doc_ref = collection_ref.document(doc_id)
             batch.set(doc_ref, question)
         
+        # Bump the version stamp so every worker reloads its cached copy
+        batch.set(db.collection('meta').document('study_plan'), {'version': firestore.Increment(1)}, merge=True)
         batch.commit()
+        _study_plan = None
         return f"Successfully seeded {len(NEETCODE_150_QUESTIONS)} NeetCode questions!"
 
     except Exception as e:
         print(f"ERROR during NeetCode seeding: {e}")
         return f"An error occurred during NeetCode seeding: {e}"
-
-def search_study_plan_questions(query_text):
-    """
-    Searches the list of NeetCode questions for titles that match the query.
-    This is a simple in-memory search.
-    """
-    # NOTE: The NEETCODE_150_QUESTIONS list is defined in this same file.
-    if not query_text:
-        return []
-    
-    query_lower = query_text.lower()
-    results = []
-    for question in NEETCODE_150_QUESTIONS:
-        if query_lower in question['title'].lower():
-            results.append({
-                'title': question['title'],
-                'titleSlug': question['titleSlug']
-            })
-    # Return a maximum of 5 results to keep the dropdown clean
-    return results[:5]
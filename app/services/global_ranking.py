@@ -0,0 +1,348 @@
+# ==============================================================================
+# Global Ranking Index
+# ------------------------------------------------------------------------------
+# This file ranks every registered Progex user by total / easy / medium / hard
+# solved counts. Each worker keeps one Fenwick tree per metric over the
+# possible solved counts, so a user's rank, a percentile or the start of any
+# leaderboard page is found in O(log n) without sorting everyone. Scores are
+# persisted as one Firestore document per user. Workers load them all once,
+# then only apply the documents changed since the newest one they have seen,
+# checking for changes when a (debounced) version on a meta document moves.
+# ==============================================================================
+
+import threading
+import time
+from flask import current_app
+from app.services import background_jobs, fanout, firebase_service, leetcode_api
+
+METRICS = ('totalSolved', 'easySolved', 'mediumSolved', 'hardSolved')
+
+
+class FenwickTree:
+    """Binary indexed tree over positions 0..size-1 with point updates and prefix sums."""
+
+    def __init__(self, size):
+        self.size = size
+        self._tree = [0] * (size + 1)
+
+    def add(self, position, delta):
+        i = position + 1
+        while i <= self.size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def prefix_sum(self, position):
+        """Sum of positions 0..position (0 for a negative position)."""
+        total, i = 0, min(position, self.size - 1) + 1
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find_by_order(self, k):
+        """Smallest position whose prefix sum reaches k (1-based), found by binary lifting."""
+        position, step = 0, 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self._tree[nxt] < k:
+                position = nxt
+                k -= self._tree[nxt]
+            step >>= 1
+        return position
+
+
+class RankingIndex:
+    """
+    In-memory ranking of every indexed user. Trees are keyed by reversed
+    score (max_score - score), so a prefix sum counts users scoring at least
+    as high, which is what ranks and top-K pages need.
+    """
+
+    def __init__(self, max_score):
+        self.max_score = max_score
+        self._scores = {}
+        self._trees = {metric: FenwickTree(max_score + 1) for metric in METRICS}
+        self._buckets = {metric: {} for metric in METRICS}  # metric -> score -> set of usernames
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, username):
+        return username in self._scores
+
+    def _position(self, score):
+        return self.max_score - max(0, min(int(score or 0), self.max_score))
+
+    def _apply(self, username, scores, delta):
+        for metric, score in zip(METRICS, scores):
+            position = self._position(score)
+            self._trees[metric].add(position, delta)
+            bucket = self._buckets[metric].setdefault(position, set())
+            if delta > 0:
+                bucket.add(username)
+            else:
+                bucket.discard(username)
+                if not bucket:
+                    del self._buckets[metric][position]
+
+    def set(self, username, scores):
+        """Adds or moves a user; scores is (total, easy, medium, hard). Returns True if anything changed."""
+        scores = tuple(int(score or 0) for score in scores)
+        with self._lock:
+            current = self._scores.get(username)
+            if current == scores:
+                return False
+            if current is not None:
+                self._apply(username, current, -1)
+            self._apply(username, scores, 1)
+            self._scores[username] = scores
+            return True
+
+    def remove(self, username):
+        with self._lock:
+            current = self._scores.pop(username, None)
+            if current is not None:
+                self._apply(username, current, -1)
+
+    def scores(self, username):
+        return self._scores.get(username)
+
+    def usernames(self):
+        with self._lock:
+            return list(self._scores)
+
+    def rank(self, username, metric):
+        """1 + the number of users with a strictly higher score, or None if not indexed."""
+        with self._lock:
+            scores = self._scores.get(username)
+            if scores is None:
+                return None
+            position = self._position(scores[METRICS.index(metric)])
+            return self._trees[metric].prefix_sum(position - 1) + 1
+
+    def percentile(self, username, metric):
+        """Percentage of users this user scores strictly higher than."""
+        with self._lock:
+            scores = self._scores.get(username)
+            if not scores:
+                return None
+            position = self._position(scores[METRICS.index(metric)])
+            at_least = self._trees[metric].prefix_sum(position)
+            return round(100.0 * (len(self._scores) - at_least) / len(self._scores), 1)
+
+    def top(self, metric, offset, limit):
+        """Returns (rank, username, score) rows offset..offset+limit-1 of the leaderboard."""
+        rows = []
+        with self._lock:
+            tree, buckets = self._trees[metric], self._buckets[metric]
+            total = len(self._scores)
+            index = offset
+            while index < total and len(rows) < limit:
+                # Jump straight to the score holding the (index+1)-th user.
+                position = tree.find_by_order(index + 1)
+                ahead = tree.prefix_sum(position - 1)
+                bucket = sorted(buckets.get(position, ()))
+                for username in bucket[index - ahead:index - ahead + limit - len(rows)]:
+                    rows.append((ahead + 1, username, self.max_score - position))
+                index = ahead + len(bucket)
+        return rows
+
+
+_index = None
+_cursor = None        # 'updated_at' of the newest score document applied to _index
+_seen_version = None  # meta version at the last sync
+_last_checked = 0.0
+_index_lock = threading.Lock()  # guards swapping the module state above
+_sync_lock = threading.Lock()   # one Firestore sync at a time
+
+# Meta version bumps are debounced to one per GLOBAL_RANKING_META_DEBOUNCE per worker
+_last_bump = 0.0
+_bump_pending = False
+_bump_lock = threading.Lock()
+
+
+def _scores_from_stats(stats):
+    return tuple(stats.get(metric) or 0 for metric in METRICS)
+
+
+def _apply_documents(index, documents):
+    """Applies [(username, score document)] to the index and returns the newest 'updated_at' among them."""
+    newest = None
+    for username, data in documents:
+        if data.get('removed') or data.get('scores') is None:
+            index.remove(username)
+        else:
+            index.set(username, data['scores'])
+        updated_at = data.get('updated_at')
+        if updated_at is not None and (newest is None or updated_at > newest):
+            newest = updated_at
+    return newest
+
+
+def _sync_due(config):
+    return _index is None or time.time() - _last_checked >= config['GLOBAL_RANKING_SYNC_INTERVAL']
+
+
+def _get_index():
+    """
+    Returns this worker's index, loading it once and then only applying
+    changed users. Firestore is read without holding _index_lock; while one
+    thread syncs, others keep serving the current index (only a worker with
+    no index yet waits for the first load).
+    """
+    global _index, _cursor, _seen_version, _last_checked
+    config = current_app.config
+    if not _sync_due(config):
+        return _index
+    if not _sync_lock.acquire(blocking=_index is None):
+        return _index
+    try:
+        if not _sync_due(config):
+            return _index
+        with _index_lock:
+            index, cursor, seen_version = _index, _cursor, _seen_version
+        version = (firebase_service.get_ranking_meta() or {}).get('version')
+        if index is None:
+            index = RankingIndex(config['GLOBAL_RANKING_MAX_SOLVED'])
+            cursor = _apply_documents(index, firebase_service.get_all_ranking_scores())
+        elif version != seen_version:
+            documents = (firebase_service.get_ranking_changes(cursor) if cursor is not None
+                         else firebase_service.get_all_ranking_scores())
+            cursor = _apply_documents(index, documents) or cursor
+        with _index_lock:
+            _index, _cursor, _seen_version, _last_checked = index, cursor, version, time.time()
+        return index
+    finally:
+        _sync_lock.release()
+
+
+def _flush_version_bump(app):
+    global _bump_pending, _last_bump
+    with _bump_lock:
+        _bump_pending = False
+        _last_bump = time.time()
+    try:
+        with app.app_context():
+            firebase_service.bump_ranking_version()
+    except Exception as e:
+        print(f"Global Ranking Error: {e}")
+
+
+def _bump_version():
+    """
+    Tells other workers that scores changed. A burst of writes leads to one
+    bump at the end of the debounce window, not one per write.
+    """
+    global _bump_pending
+    with _bump_lock:
+        if _bump_pending:
+            return
+        _bump_pending = True
+        delay = max(0.0, _last_bump + current_app.config['GLOBAL_RANKING_META_DEBOUNCE'] - time.time())
+    timer = threading.Timer(delay, _flush_version_bump, args=(current_app._get_current_object(),))
+    timer.daemon = True
+    timer.start()
+
+
+def _store(updates):
+    """Persists {username: scores or None (removed)} and schedules a version bump."""
+    firebase_service.write_ranking_scores(updates)
+    _bump_version()
+
+
+def _apply_stats(results):
+    index = _get_index()
+    updates = {}
+    for username, stats in results.items():
+        # Only registered users are ranked; anyone else's stats are ignored here.
+        if stats and username in index and index.set(username, _scores_from_stats(stats)):
+            updates[username] = index.scores(username)
+    if updates:
+        _store(updates)
+
+
+def record_stats(results):
+    """Called with freshly fetched {username: stats}; moves registered users in the background."""
+    if not any(results.values()):
+        return
+    try:
+        fanout.submit_background(_apply_stats, dict(results))
+    except Exception as e:
+        print(f"Global Ranking Error: {e}")
+
+
+def _register(username):
+    index = _get_index()
+    if username in index:
+        return
+    stats = leetcode_api.get_user_stats(username)
+    scores = _scores_from_stats(stats) if stats else (0, 0, 0, 0)
+    index.set(username, scores)
+    _store({username: scores})
+
+
+def register_user(username):
+    """Adds a registered user to the ranking (in the background) if they are not in it yet."""
+    try:
+        fanout.submit_background(_register, username)
+    except Exception as e:
+        print(f"Global Ranking Error: {e}")
+
+
+def _unregister(username):
+    _get_index().remove(username)
+    _store({username: None})
+
+
+def unregister_user(username):
+    """Drops a deleted user from the ranking (in the background)."""
+    try:
+        fanout.submit_background(_unregister, username)
+    except Exception as e:
+        print(f"Global Ranking Error: {e}")
+
+
+def get_page(metric, page, per_page):
+    index = _get_index()
+    offset = (page - 1) * per_page
+    return [{'rank': rank, 'username': username, 'score': score}
+            for rank, username, score in index.top(metric, offset, per_page)], len(index)
+
+
+def get_standing(username):
+    """The user's rank and percentile for every metric, or None if they are not ranked."""
+    index = _get_index()
+    if username not in index:
+        return None
+    return {metric: {'rank': index.rank(username, metric), 'percentile': index.percentile(username, metric)}
+            for metric in METRICS}
+
+
+def rebuild():
+    """
+    One-off backfill that ranks every registered user from their current
+    LeetCode stats, one fan-out batch at a time. Normal operation only ever
+    applies incremental updates. Runs as a background job (see start_rebuild).
+    """
+    usernames = firebase_service.get_all_usernames()
+    chunk_size = current_app.config['LEETCODE_BATCH_SIZE'] * current_app.config['LEETCODE_MAX_CONCURRENCY']
+    index = _get_index()
+    ranked = 0
+    for i in range(0, len(usernames), chunk_size):
+        all_stats = leetcode_api.get_user_stats_many(usernames[i:i + chunk_size])
+        updates = {}
+        for username, stats in all_stats.items():
+            scores = _scores_from_stats(stats) if stats else (0, 0, 0, 0)
+            # Users whose stored scores are already current cost no write
+            if index.set(username, scores):
+                updates[username] = scores
+            ranked += 1
+        if updates:
+            _store(updates)
+    return f"Ranked {ranked} registered users globally."
+
+
+def start_rebuild():
+    """Starts rebuild() in the background; returns False if one is already running in this worker."""
+    return background_jobs.start('rebuild_global_ranking', rebuild)
@@ -0,0 +1,146 @@
+# ==============================================================================
+# Materialized Friends Leaderboard
+# ------------------------------------------------------------------------------
+# This file keeps every user's friends leaderboard as one stored Firestore
+# document: the ranked entries plus a compact per-member history of rank and
+# solved-count changes for the trend chart. Whenever fresh stats arrive from
+# LeetCode, the boards that include that user are updated in the background,
+# so opening the leaderboard is a single document read.
+# ==============================================================================
+
+import datetime
+from flask import current_app
+from app.services import fanout, firebase_service, leetcode_api
+from app.services.cache import ChangeTracker
+
+_ENTRY_FIELDS = ('username', 'avatar', 'totalSolved', 'easySolved', 'mediumSolved', 'hardSolved', 'streak')
+
+_pushed_entries = ChangeTracker()
+
+
+def _entry(stats):
+    return {field: stats.get(field) for field in _ENTRY_FIELDS}
+
+
+def _today():
+    return datetime.date.today().toordinal()
+
+
+def _rank(board, history_limit):
+    """Sorts entries, assigns ranks and appends changed ranks/solved counts to the history."""
+    entries = sorted(board['entries'], key=lambda e: (-(e.get('totalSolved') or 0), e['username']))
+    history = board.setdefault('history', {})
+    today = _today()
+    for rank, entry in enumerate(entries, start=1):
+        entry['rank'] = rank
+        # Parallel arrays, because Firestore can't store nested arrays
+        series = history.setdefault(entry['username'], {'days': [], 'ranks': [], 'solved': []})
+        point = (rank, entry.get('totalSolved') or 0)
+        if series['days'] and (series['ranks'][-1], series['solved'][-1]) == point:
+            continue
+        if series['days'] and series['days'][-1] == today:
+            series['ranks'][-1], series['solved'][-1] = point
+        else:
+            series['days'].append(today)
+            series['ranks'].append(point[0])
+            series['solved'].append(point[1])
+        for key in ('days', 'ranks', 'solved'):
+            del series[key][:-history_limit]
+    board['entries'] = entries
+    return board
+
+
+def rebuild(username):
+    """Builds (or re-syncs the membership of) a user's board from their current friend list."""
+    friends = firebase_service.get_friends(username)
+    # Friends who have since deleted their account are left off (one batched read)
+    members = [username] + [friend for friend, data in zip(friends, firebase_service.get_users_data(friends)) if data]
+    all_stats = leetcode_api.get_user_stats_many(members)
+    entries = [_entry(stats) for member in members if (stats := all_stats.get(member))]
+    history_limit = current_app.config['LEADERBOARD_HISTORY_MAX_POINTS']
+
+    def mutate(current):
+        history = (current or {}).get('history', {})
+        board = {
+            'entries': entries,
+            # Lets stats updates find every board that shows a user, follower or not
+            'members': members,
+            'history': {member: history[member] for member in members if member in history},
+            'needs_rebuild': False
+        }
+        return _rank(board, history_limit)
+
+    return firebase_service.update_leaderboard(username, mutate) or _rank({'entries': entries}, history_limit)
+
+
+def get_board(username):
+    """Returns the user's stored board, building it on first use or after a friend list change."""
+    board = firebase_service.get_leaderboard(username)
+    if not board or board.get('needs_rebuild') or 'members' not in board:
+        board = rebuild(username)
+    return board
+
+
+def _apply_update(username, entry, history_limit):
+    def mutate(current):
+        # Boards that don't exist yet are built on first view instead
+        if not current or 'entries' not in current:
+            return None
+        entries = current['entries']
+        for i, existing in enumerate(entries):
+            if existing['username'] == username:
+                if all(existing.get(f) == entry[f] for f in _ENTRY_FIELDS):
+                    return None
+                entries[i] = dict(entry)
+                return _rank(current, history_limit)
+        return None
+
+    # Friendships can be one-way, so look boards up by membership, not by our friend list
+    for owner in firebase_service.get_leaderboard_owners(username):
+        firebase_service.update_leaderboard(owner, mutate)
+
+
+def _apply_updates(changed, history_limit):
+    for username, entry in changed.items():
+        try:
+            _apply_update(username, entry, history_limit)
+        except Exception as e:
+            print(f"Leaderboard Update Error for {username}: {e}")
+
+
+def record_stats(results):
+    """
+    Called with freshly fetched {username: stats}. Updates, in the background,
+    every leaderboard that includes a user whose stats changed.
+    """
+    changed = {}
+    for username, stats in results.items():
+        if stats and _pushed_entries.changed(username, entry := _entry(stats)):
+            changed[username] = entry
+    if not changed:
+        return
+    try:
+        fanout.submit_background(_apply_updates, changed, current_app.config['LEADERBOARD_HISTORY_MAX_POINTS'])
+    except Exception as e:
+        print(f"Leaderboard Update Error: {e}")
+
+
+def trend_series(board):
+    """Turns the stored history into chart series: shared date labels and each member's rank per date."""
+    history = board.get('history', {})
+    days = sorted({day for series in history.values() for day in series.get('days', [])})
+    labels = [datetime.date.fromordinal(day).isoformat() for day in days]
+    series_list = []
+    for entry in board.get('entries', []):
+        series = history.get(entry['username'])
+        if not series:
+            continue
+        points = dict(zip(series['days'], zip(series['ranks'], series['solved'])))
+        ranks, solved, last = [], [], None
+        for day in days:
+            # Carry the last known value forward over days without a change
+            last = points.get(day, last)
+            ranks.append(last[0] if last else None)
+            solved.append(last[1] if last else None)
+        series_list.append({'username': entry['username'], 'ranks': ranks, 'solved': solved})
+    return {'labels': labels, 'series': series_list}
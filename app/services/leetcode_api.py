@@ -1,37 +1,154 @@
+import json
+import threading
+import time
 import httpx
 from flask import current_app
+from app.services import fanout, global_ranking, leaderboard, stat_history, submission_calendar
+from app.services.cache import TTLCache, FRESH, STALE
+from app.services.resilience import CircuitBreaker, RetryBudget, TokenBucket, backoff_delay
+from app.services.singleflight import SingleFlight
 
-def _send_graphql_request(query, variables):
+# Coalesces identical GraphQL requests that are in flight at the same time.
+_inflight = SingleFlight()
+
+# One bounded cache per data type, created on first use from the app config.
+_caches = {}
+_caches_lock = threading.Lock()
+# Circuit breaker, retry budget and rate limiter guarding leetcode.com.
+_guards = None
+# Upstream requests sent by each thread, so background callers can charge their budget exactly.
+_thread_requests = threading.local()
+
+def _get_cache(kind):
+    cache = _caches.get(kind)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(kind)
+            if cache is None:
+                soft_ttl, hard_ttl = current_app.config['LEETCODE_CACHE_TTLS'][kind]
+                cache = TTLCache(kind, soft_ttl, hard_ttl,
+                                 current_app.config['LEETCODE_CACHE_MAX_ENTRIES'],
+                                 schedule=fanout.submit_background,
+                                 backend=current_app.config.get('SHARED_CACHE'))
+                _caches[kind] = cache
+    return cache
+
+def get_cache_stats():
+    """Returns the hit/miss/eviction counters of every LeetCode data cache."""
+    return [cache.stats() for cache in list(_caches.values())]
+
+def get_coalescing_stats():
+    """Returns how many GraphQL calls went upstream vs. joined an in-flight one."""
+    return _inflight.stats()
+
+def upstream_requests_sent():
+    """How many HTTP requests (retries and fallbacks included) this thread has sent to LeetCode."""
+    return getattr(_thread_requests, 'count', 0)
+
+def _send_graphql_request(query, variables, allow_partial=False):
+    """
+    Posts a GraphQL document to LeetCode and returns its 'data' payload.
+    With allow_partial=True, field-level errors (e.g. one unknown user in a
+    batched query) are logged and whatever data came back is still returned.
+    Concurrent calls with the same query and variables share one upstream
+    request, so callers must treat the returned data as read-only.
+    """
+    key = (query, json.dumps(variables, sort_keys=True), allow_partial)
+    return _inflight.do(key, lambda: _post_graphql_request(query, variables, allow_partial))
+
+def _get_guards():
+    """Lazily builds the per-worker circuit breaker, retry budget and rate limiter."""
+    global _guards
+    if _guards is None:
+        with _caches_lock:
+            if _guards is None:
+                config = current_app.config
+                _guards = {
+                    'breaker': CircuitBreaker(config['LEETCODE_BREAKER_ERROR_THRESHOLD'],
+                                              config['LEETCODE_BREAKER_MIN_REQUESTS'],
+                                              config['LEETCODE_BREAKER_WINDOW'],
+                                              config['LEETCODE_BREAKER_COOLDOWN']),
+                    'retry_budget': RetryBudget(config['LEETCODE_RETRY_BUDGET_RATIO'],
+                                                config['LEETCODE_RETRY_BUDGET_MIN_PER_SECOND'],
+                                                config['LEETCODE_RETRY_BUDGET_MAX_TOKENS']),
+                    'rate_limiter': TokenBucket(config['LEETCODE_RATE_LIMIT_PER_SECOND'],
+                                                config['LEETCODE_RATE_LIMIT_BURST'])
+                }
+    return _guards
+
+def get_upstream_health():
+    """Returns the circuit breaker, retry budget and rate limiter state for this worker."""
+    guards = _get_guards()
+    return {name: guard.state() for name, guard in guards.items()}
+
+def _post_graphql_request(query, variables, allow_partial):
     url = current_app.config['LEETCODE_API_ENDPOINT']
+    # The pooled client is created by the app factory and reused across requests
+    client = current_app.config['LEETCODE_CLIENT']
     json_payload = {"query": query, "variables": variables}
-    try:
-        with httpx.Client() as client:
-            response = client.post(url, json=json_payload, timeout=20.0)
+    guards = _get_guards()
+    breaker, retry_budget, rate_limiter = guards['breaker'], guards['retry_budget'], guards['rate_limiter']
+    # Only read queries are safe to send twice.
+    idempotent = query.lstrip().startswith('query')
+    max_retries = current_app.config['LEETCODE_MAX_RETRIES'] if idempotent else 0
+
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        # The breaker is asked first, so an open circuit fails fast without waiting for a token.
+        if not breaker.allow():
+            print("API Service Error: circuit breaker is open, skipping LeetCode request")
+            return None
+        if not rate_limiter.acquire(current_app.config['LEETCODE_RATE_LIMIT_WAIT']):
+            breaker.cancel()
+            print("API Service Error: client-side rate limit reached")
+            return None
+        try:
+            _thread_requests.count = upstream_requests_sent() + 1
+            response = client.post(url, json=json_payload)
+            # Throttling and server errors count against upstream health and may be retried.
+            if response.status_code == 429 or response.status_code >= 500:
+                raise httpx.HTTPStatusError(f"Upstream returned {response.status_code}",
+                                            request=response.request, response=response)
+            # Success is only recorded once the body parses; other 4xx are our mistake, not upstream's.
+            data = response.json() if response.is_success else None
+            breaker.record_success()
             response.raise_for_status()
-            data = response.json()
             if "errors" in data:
                 print(f"GraphQL Error: {data['errors']}")
-                return None
+                if not allow_partial:
+                    return None
             return data.get('data')
-    except Exception as e:
-        print(f"API Service Error: {e}")
-        return None
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if isinstance(e, httpx.TransportError) or e.response.status_code == 429 or e.response.status_code >= 500:
+                breaker.record_failure()
+                if attempt < max_retries and retry_budget.try_spend():
+                    time.sleep(backoff_delay(attempt, current_app.config['LEETCODE_RETRY_BASE_DELAY'],
+                                             current_app.config['LEETCODE_RETRY_MAX_DELAY']))
+                    attempt += 1
+                    continue
+            print(f"API Service Error: {e}")
+            return None
+        except Exception as e:
+            # Anything unexpected (e.g. a malformed response) still counts against
+            # upstream health, and releases a half-open probe.
+            breaker.record_failure()
+            print(f"API Service Error: {e}")
+            return None
 
-def get_user_stats(username):
-    stats_query = """
-    query userPublicProfile($username: String!) {
-        matchedUser(username: $username) {
-            username
-            profile { userAvatar ranking }
-            submitStats: submitStatsGlobal { acSubmissionNum { difficulty count } }
-        }
-    }
-    """
-    stats_data = _send_graphql_request(stats_query, {"username": username})
-    if not stats_data or not stats_data.get('matchedUser'):
-        return None
+# The fields shared by the single-user and batched profile queries.
+_PROFILE_FIELDS = """
+    username
+    profile { userAvatar ranking }
+    submitStats: submitStatsGlobal { acSubmissionNum { difficulty count } }
+    userCalendar { submissionCalendar }
+"""
 
-    user_data = stats_data['matchedUser']
+def _format_user_stats(user_data):
+    """
+    Converts a raw 'matchedUser' object into the stats dict used by the
+    templates. The streak is worked out from the submission calendar.
+    """
     stats = user_data['submitStats']['acSubmissionNum']
     formatted_stats = {
         'username': user_data['username'], 'avatar': user_data['profile']['userAvatar'],
@@ -46,16 +163,207 @@ def get_user_stats(username):
     else:
         formatted_stats['globalRanking'] = "N/A"
 
-    streak_query = """
-    query userDailyCodingChallenge($username: String!) {
-        matchedUser(username: $username) { userCalendar { streak } }
+    # Only the packed calendar is kept; the raw JSON string is several times larger
+    day_counts = submission_calendar.parse((user_data.get('userCalendar') or {}).get('submissionCalendar'))
+    formatted_stats['calendarDays'] = submission_calendar.pack_days(day_counts)
+    formatted_stats['streak'] = submission_calendar.current_streak(day_counts)
+    return formatted_stats
+
+def get_user_stats(username):
+    """Returns the (cached) profile stats for one user, or None if not found."""
+    return _get_cache('stats').get_or_load(username, lambda: _load_user_stats(username))
+
+def _publish_stats(results):
+    """
+    Hands freshly fetched {username: stats} to everything derived from them:
+    the materialized leaderboards, the global ranking, the daily stat history
+    and the stored submission calendars. Each updates in the background.
+    """
+    leaderboard.record_stats(results)
+    global_ranking.record_stats(results)
+    stat_history.record_stats(results)
+    submission_calendar.record_stats(results)
+
+def _load_user_stats(username):
+    stats = _fetch_user_stats(username)
+    _publish_stats({username: stats})
+    return stats
+
+def _fetch_user_stats(username):
+    stats_query = """
+    query userPublicProfile($username: String!) {
+        matchedUser(username: $username) {%s}
     }
+    """ % _PROFILE_FIELDS
+    stats_data = _send_graphql_request(stats_query, {"username": username})
+    if not stats_data or not stats_data.get('matchedUser'):
+        return None
+    return _format_user_stats(stats_data['matchedUser'])
+
+def _fetch_user_stats_chunk(usernames):
     """
-    streak_data = _send_graphql_request(streak_query, {"username": username})
-    formatted_stats['streak'] = streak_data['matchedUser']['userCalendar']['streak'] if streak_data and streak_data.get('matchedUser') and streak_data['matchedUser'].get('userCalendar') else 0
-    return formatted_stats
+    Fetches profile, solved counts and submission calendar for a handful of
+    users in a single aliased GraphQL document (u0: matchedUser(...), u1: ...).
+    """
+    aliases = [f"u{i}" for i in range(len(usernames))]
+    params = ", ".join(f"${alias}: String!" for alias in aliases)
+    fields = "".join(
+        f"{alias}: matchedUser(username: ${alias}) {{{_PROFILE_FIELDS}}}\n"
+        for alias in aliases
+    )
+    query = f"query batchUserProfiles({params}) {{\n{fields}}}"
+    variables = dict(zip(aliases, usernames))
 
-def get_recent_submissions(username, limit=10):
+    data = _send_graphql_request(query, variables, allow_partial=True)
+    if data is None:
+        # The whole document failed, so fall back to one lookup per user
+        # to keep a single bad entry from hiding everyone else's stats.
+        return {username: _fetch_user_stats(username) for username in usernames}
+
+    results = {}
+    for alias, username in zip(aliases, usernames):
+        user_data = data.get(alias)
+        if not user_data:
+            results[username] = None
+            continue
+        results[username] = _format_user_stats(user_data)
+    return results
+
+def _fetch_user_stats_many(usernames):
+    chunk_size = current_app.config['LEETCODE_BATCH_SIZE']
+    chunks = [tuple(usernames[i:i + chunk_size]) for i in range(0, len(usernames), chunk_size)]
+
+    # Chunks are independent documents, so send them concurrently.
+    chunk_results = fanout.fan_out(_fetch_user_stats_chunk, chunks,
+                                   timeout=current_app.config['LEETCODE_FANOUT_TIMEOUT'])
+    results = dict.fromkeys(usernames)
+    for chunk_result in chunk_results.values():
+        if chunk_result:
+            results.update(chunk_result)
+    _publish_stats(results)
+    return results
+
+def _refresh_user_stats_many(usernames):
+    """Background refresh of stale stats entries claimed by get_user_stats_many."""
+    cache = _get_cache('stats')
+    try:
+        fetched = _fetch_user_stats_many(usernames)
+    except Exception as e:
+        print(f"Cache Refresh Error (stats): {e}")
+        fetched = {}
+    for username in usernames:
+        cache.end_refresh(username, fetched.get(username))
+
+def get_user_stats_many(usernames):
+    """
+    Batched version of get_user_stats. Returns a dict mapping each requested
+    username to its stats dict, or to None if that user could not be fetched.
+    Cached users (and users with a cached snapshot) are served from memory;
+    only the misses go upstream.
+    """
+    unique_usernames = list(dict.fromkeys(u for u in usernames if u))
+    cache, snapshots = _get_cache('stats'), _get_cache('snapshot')
+    results, missing, stale = {}, [], []
+    for username in unique_usernames:
+        value, state = cache.lookup(username)
+        if state in (FRESH, STALE):
+            results[username] = value
+            if state == STALE and cache.begin_refresh(username):
+                stale.append(username)
+            continue
+        # Users who opened a page recently have a snapshot holding their stats;
+        # a stale one is served while the batched refresh below fills the stats cache
+        snapshot, state = snapshots.lookup(username)
+        if state in (FRESH, STALE) and snapshot:
+            results[username] = snapshot['stats']
+            if state == STALE and cache.begin_refresh(username):
+                stale.append(username)
+        else:
+            missing.append(username)
+
+    if stale:
+        try:
+            fanout.submit_background(_refresh_user_stats_many, stale)
+        except Exception as e:
+            print(f"Cache Refresh Error (stats): {e}")
+            for username in stale:
+                cache.end_refresh(username, None)
+
+    if missing:
+        for username, stats in _fetch_user_stats_many(missing).items():
+            if stats is not None:
+                cache.set(username, stats)
+            results[username] = stats
+
+    return {username: results.get(username) for username in unique_usernames}
+
+# --- Cache Warming Helpers (used by the background cache warmer) ---
+def stats_need_refresh(username, within):
+    """True if the cached stats for username are missing or go stale within 'within' seconds."""
+    return _get_cache('stats').needs_refresh(username, within)
+
+def refresh_user_stats(usernames):
+    """Fetches stats for the given users straight into the cache and returns them."""
+    cache = _get_cache('stats')
+    fetched = _fetch_user_stats_many(list(dict.fromkeys(usernames)))
+    for username, stats in fetched.items():
+        if stats is not None:
+            cache.set(username, stats)
+    return fetched
+
+def snapshot_needs_refresh(username, within):
+    """True if the cached snapshot for username is missing or goes stale within 'within' seconds."""
+    return _get_cache('snapshot').needs_refresh(username, within)
+
+def refresh_user_snapshot(username):
+    """Fetches a user's snapshot straight into the cache and returns it."""
+    snapshot = _load_user_snapshot(username)
+    if snapshot is not None:
+        _get_cache('snapshot').set(username, snapshot)
+    return snapshot
+
+# --- User Snapshot ---
+def get_user_snapshot(username):
+    """
+    Returns everything the per-user pages need about one user, fetched in a
+    single GraphQL document and cached as one object:
+    {'stats': <stats dict>, 'submissions': [<most recent submissions, newest first>]}.
+    Returns None if the user could not be fetched.
+    """
+    return _get_cache('snapshot').get_or_load(username, lambda: _load_user_snapshot(username))
+
+def _load_user_snapshot(username):
+    snapshot = _fetch_user_snapshot(username)
+    if snapshot is not None:
+        # The profile half doubles as this user's stats entry (friends lists, leaderboards).
+        _get_cache('stats').set(username, snapshot['stats'])
+        _publish_stats({username: snapshot['stats']})
+    return snapshot
+
+def _fetch_user_snapshot(username):
+    query = """
+    query userSnapshot($username: String!, $limit: Int!) {
+        matchedUser(username: $username) {%s}
+        recentSubmissionList(username: $username, limit: $limit) {
+            title titleSlug timestamp statusDisplay lang
+        }
+    }
+    """ % _PROFILE_FIELDS
+    limit = current_app.config['LEETCODE_SNAPSHOT_SUBMISSIONS']
+    data = _send_graphql_request(query, {"username": username, "limit": limit})
+    # None marks a failed request so that it is not cached
+    if not data or not data.get('matchedUser'):
+        return None
+    return {
+        'stats': _format_user_stats(data['matchedUser']),
+        'submissions': data.get('recentSubmissionList') or []
+    }
+
+def fetch_recent_submissions(username, limit):
+    """
+    Uncached fetch of a user's last 'limit' submissions, newest first, or None
+    on failure. Only for the rare sync whose snapshot window is too short.
+    """
     query = """
     query recentSubmissions($username: String!, $limit: Int!) {
         recentSubmissionList(username: $username, limit: $limit) {
@@ -64,7 +372,12 @@ def get_recent_submissions(username, limit=10):
     }
     """
     data = _send_graphql_request(query, {"username": username, "limit": limit})
-    return data.get('recentSubmissionList', []) if data else []
+    return (data.get('recentSubmissionList') or []) if data else None
+
+def get_recent_submissions(username, limit=10):
+    """Returns the most recent submissions of a user, newest first, sliced from their snapshot."""
+    snapshot = get_user_snapshot(username)
+    return snapshot['submissions'][:limit] if snapshot else []
 
 def get_daily_challenge():
     query = """
@@ -83,4 +396,27 @@ def get_daily_challenge():
             'difficulty': challenge_data['question']['difficulty'],
             'link': f"https://leetcode.com{challenge_data['link']}"
         }
-    return None
\ No newline at end of file
+    return None
+
+
+def get_problem_list_page(skip, limit):
+    """
+    Returns one page of LeetCode's problem list as (total, questions), or
+    None if the request failed. Used by the catalog sync, never per request.
+    """
+    query = """
+    query problemsetQuestionList($categorySlug: String, $limit: Int, $skip: Int, $filters: QuestionListFilterInput) {
+        problemsetQuestionList: questionList(categorySlug: $categorySlug, limit: $limit, skip: $skip, filters: $filters) {
+            total: totalNum
+            questions: data {
+                title titleSlug difficulty isPaidOnly
+                topicTags { name slug }
+            }
+        }
+    }
+    """
+    data = _send_graphql_request(query, {"categorySlug": "", "skip": skip, "limit": limit, "filters": {}})
+    if not data or not data.get('problemsetQuestionList'):
+        return None
+    page = data['problemsetQuestionList']
+    return page.get('total') or 0, page.get('questions') or []
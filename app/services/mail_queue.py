@@ -0,0 +1,155 @@
+# ==============================================================================
+# Background Email Delivery Queue
+# ------------------------------------------------------------------------------
+# This file moves email delivery off the request path. Routes enqueue a
+# ready-built message and return immediately; a few worker threads deliver
+# queued mail over SMTP connections they keep open between messages, so the
+# connect / STARTTLS / login cost is paid once per idle period rather than
+# once per email. Failed sends are retried with backoff, and the queue is
+# bounded so a mail outage can't grow memory without limit.
+# ==============================================================================
+
+import queue
+import smtplib
+import threading
+import time
+from app.services.resilience import backoff_delay
+
+# Errors that will not go away by sending the same message again
+_PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)
+
+
+class _Job:
+    __slots__ = ('messages', 'description', 'attempt')
+
+    def __init__(self, messages, description):
+        self.messages = messages
+        self.description = description
+        self.attempt = 0
+
+
+class MailQueue:
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config['MAIL_QUEUE_WORKERS']
+        self.max_retries = app.config['MAIL_MAX_RETRIES']
+        self.retry_base_delay = app.config['MAIL_RETRY_BASE_DELAY']
+        self.retry_max_delay = app.config['MAIL_RETRY_MAX_DELAY']
+        self.idle_timeout = app.config['MAIL_CONNECTION_IDLE_TIMEOUT']
+        self._queue = queue.Queue(maxsize=app.config['MAIL_QUEUE_MAX_SIZE'])
+        self._lock = threading.Lock()
+        self._threads = []
+        self.enqueued = self.sent = self.retries = self.failed = self.dropped = 0
+        self.connections_opened = 0
+
+    def enqueue(self, messages, description):
+        """
+        Queues one or more messages for delivery over a single SMTP session.
+        Returns False (and drops them) if the queue is full.
+        """
+        if not isinstance(messages, (list, tuple)):
+            messages = [messages]
+        self._start_workers()
+        try:
+            self._queue.put_nowait(_Job(list(messages), description))
+        except queue.Full:
+            with self._lock:
+                self.dropped += len(messages)
+            print(f"ERROR: Mail queue is full, dropped {description}")
+            return False
+        with self._lock:
+            self.enqueued += len(messages)
+        return True
+
+    def _start_workers(self):
+        if self._threads:
+            return
+        with self._lock:
+            # Started lazily so the threads are created inside the gunicorn worker.
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'mail-worker-{i}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+
+    def _open(self, mail):
+        connection = mail.connect()
+        connection.__enter__()
+        with self._lock:
+            self.connections_opened += 1
+        return connection
+
+    @staticmethod
+    def _close(connection):
+        if connection is None:
+            return
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass  # The server may already have dropped the connection
+
+    def _run(self):
+        with self.app.app_context():
+            mail = self.app.extensions['mail']
+            connection = None
+            while True:
+                try:
+                    job = self._queue.get(timeout=self.idle_timeout)
+                except queue.Empty:
+                    # Servers drop idle sessions anyway; close ours cleanly first.
+                    self._close(connection)
+                    connection = None
+                    continue
+                if job is None:
+                    self._close(connection)
+                    return
+                connection = self._deliver(mail, connection, job)
+
+    def _deliver(self, mail, connection, job):
+        """Sends a job's remaining messages, retrying with backoff; returns the connection to keep."""
+        while job.messages:
+            try:
+                if connection is None:
+                    connection = self._open(mail)
+                connection.send(job.messages[0])
+                job.messages.pop(0)
+                with self._lock:
+                    self.sent += 1
+            except _PERMANENT_ERRORS as e:
+                job.messages.pop(0)
+                with self._lock:
+                    self.failed += 1
+                print(f"ERROR: Mail server refused {job.description}: {e}")
+            except Exception as e:
+                # The session is in an unknown state after an error; start a fresh one.
+                self._close(connection)
+                connection = None
+                if job.attempt >= self.max_retries:
+                    with self._lock:
+                        self.failed += len(job.messages)
+                    print(f"ERROR: FAILED TO SEND {job.description} after {job.attempt + 1} attempts: {e}")
+                    return None
+                with self._lock:
+                    self.retries += 1
+                time.sleep(backoff_delay(job.attempt, self.retry_base_delay, self.retry_max_delay))
+                job.attempt += 1
+        print(f"INFO: Successfully delivered {job.description}")
+        return connection
+
+    def close(self, timeout=5.0):
+        """Asks the workers to finish the queued mail and waits briefly for them."""
+        for _ in self._threads:
+            try:
+                self._queue.put(None, timeout=timeout)
+            except queue.Full:
+                break
+        deadline = time.time() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize(), 'max_size': self._queue.maxsize, 'workers': len(self._threads),
+            'enqueued': self.enqueued, 'sent': self.sent, 'retries': self.retries,
+            'failed': self.failed, 'dropped': self.dropped, 'connections_opened': self.connections_opened
+        }
@@ -0,0 +1,52 @@
+# ==============================================================================
+# Packed Day Arrays
+# ------------------------------------------------------------------------------
+# This file holds the helpers shared by the per-user, per-year Firestore
+# documents that store one small number per day (stat snapshots, submission
+# calendars). Values are uint16 arrays packed little-endian into bytes, so a
+# year of one metric is 732 bytes and a date range costs one read per year.
+# ==============================================================================
+
+import calendar
+import datetime
+import sys
+from array import array
+
+# Largest storable value; also used as a "no data" marker where needed
+MAX_VALUE = 0xFFFF
+
+
+def days_in_year(year):
+    return 366 if calendar.isleap(year) else 365
+
+
+def day_of_year(day):
+    """0-based slot of a date within its year."""
+    return day.timetuple().tm_yday - 1
+
+
+def unpack(blob, length, fill=0):
+    """Decodes a packed blob into a uint16 array, or a fresh one if it is missing or malformed."""
+    values = array('H')
+    if blob:
+        values.frombytes(bytes(blob))
+        if sys.byteorder == 'big':
+            values.byteswap()
+    if len(values) != length:
+        values = array('H', [fill]) * length
+    return values
+
+
+def pack(values):
+    if sys.byteorder == 'big':
+        values = array('H', values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def doc_id(username, year):
+    return f"{username}_{year}"
+
+
+def slot_date(year, slot):
+    return datetime.date(year, 1, 1) + datetime.timedelta(days=slot)
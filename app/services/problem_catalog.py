@@ -0,0 +1,206 @@
+# ==============================================================================
+# Local Problem Catalog
+# ------------------------------------------------------------------------------
+# This file keeps a local mirror of LeetCode's full problem list (slug, title,
+# difficulty, topic tags, premium flag) in a read-only SQLite file that every
+# worker memory-maps. A sync job pages through the problem list and swaps in a
+# freshly written file, so challenge creation and search can validate slugs
+# and look up titles and metadata without any network calls.
+# ==============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+from app.services import background_jobs, leetcode_api, problem_index, problem_search
+from app.services.firebase_service import NEETCODE_150_QUESTIONS
+
+# Maximum number of bound parameters per 'IN (...)' lookup
+_LOOKUP_CHUNK_SIZE = 500
+# Marks a search index that has never been built (a missing file has version None)
+_NOT_BUILT = object()
+
+
+def _row_to_problem(row):
+    slug, title, difficulty, paid_only, tags = row
+    return {'title': title, 'titleSlug': slug, 'difficulty': difficulty,
+            'isPaidOnly': bool(paid_only), 'topicTags': json.loads(tags)}
+
+
+class ProblemCatalog:
+    def __init__(self, path, mmap_size):
+        self.path = path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._search_version = _NOT_BUILT
+        self._lock = threading.Lock()
+        self.lookups = self.errors = 0
+
+    def version(self):
+        """Identifies the current catalog file; changes every time a sync swaps it in."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _connection(self):
+        # One read-only connection per thread per process, reopened after a sync replaced the file.
+        version = self.version()
+        if version is None:
+            return None
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.version != version or self._local.pid != os.getpid():
+            if conn is not None:
+                conn.close()
+            conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+            conn.execute(f'PRAGMA mmap_size={int(self.mmap_size)}')
+            conn.execute('PRAGMA query_only=ON')
+            self._local.conn = conn
+            self._local.version = version
+            self._local.pid = os.getpid()
+        return conn
+
+    def _query(self, sql, params=()):
+        try:
+            conn = self._connection()
+            return conn.execute(sql, params).fetchall() if conn else []
+        except Exception as e:
+            self.errors += 1
+            print(f"Problem Catalog Error: {e}")
+            return []
+
+    def get_many(self, slugs):
+        """Returns {slug: problem} for the slugs found in the catalog."""
+        slugs = list(dict.fromkeys(slugs))
+        self.lookups += 1
+        found = {}
+        for i in range(0, len(slugs), _LOOKUP_CHUNK_SIZE):
+            chunk = slugs[i:i + _LOOKUP_CHUNK_SIZE]
+            placeholders = ', '.join('?' * len(chunk))
+            for row in self._query(
+                f'SELECT slug, title, difficulty, paid_only, tags FROM problems WHERE slug IN ({placeholders})', chunk
+            ):
+                found[row[0]] = _row_to_problem(row)
+        return found
+
+    def get(self, slug):
+        return self.get_many([slug]).get(slug)
+
+    def all(self):
+        return [_row_to_problem(row) for row in
+                self._query('SELECT slug, title, difficulty, paid_only, tags FROM problems ORDER BY slug')]
+
+    def count(self):
+        rows = self._query('SELECT COUNT(*) FROM problems')
+        return rows[0][0] if rows else 0
+
+    def replace(self, problems):
+        """Writes a complete catalog to a temporary file and atomically swaps it in."""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        conn = sqlite3.connect(temp_path)
+        try:
+            conn.execute(
+                """
+                CREATE TABLE problems (
+                    slug TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    difficulty TEXT,
+                    paid_only INTEGER NOT NULL,
+                    tags TEXT NOT NULL
+                ) WITHOUT ROWID
+                """
+            )
+            conn.executemany(
+                'INSERT OR REPLACE INTO problems (slug, title, difficulty, paid_only, tags) VALUES (?, ?, ?, ?, ?)',
+                [(p['titleSlug'], p['title'], p.get('difficulty'), int(bool(p.get('isPaidOnly'))),
+                  json.dumps(p.get('topicTags', []), separators=(',', ':'))) for p in problems]
+            )
+            conn.commit()
+            conn.execute('VACUUM')
+        finally:
+            conn.close()
+        os.replace(temp_path, self.path)
+
+    def refresh_search_index(self):
+        """Rebuilds this worker's search index if the catalog file changed since the last build."""
+        version = self.version()
+        if version == self._search_version:
+            return
+        with self._lock:
+            if version == self._search_version:
+                return
+            problems = self.all()
+            problem_index.seed(problem['titleSlug'] for problem in problems)
+            problem_search.build_index(NEETCODE_150_QUESTIONS + problems)
+            self._search_version = version
+
+    def stats(self):
+        return {'path': self.path, 'problems': self.count(), 'lookups': self.lookups, 'errors': self.errors}
+
+
+def resolve_problems(catalog, slugs):
+    """
+    Turns user-entered slugs into challenge problem dicts with their real
+    title and metadata. Returns (problems, unknown_slugs); before the first
+    sync nothing can be validated, so slugs outside the NeetCode list are
+    accepted with a title derived from the slug.
+    """
+    slugs = list(dict.fromkeys(slugs))
+    found = catalog.get_many(slugs)
+    neetcode = {question['titleSlug']: question for question in NEETCODE_150_QUESTIONS}
+    synced = catalog.version() is not None
+    problems, unknown = [], []
+    for slug in slugs:
+        problem = found.get(slug)
+        if problem:
+            problems.append({'title': problem['title'], 'titleSlug': slug,
+                             'difficulty': problem['difficulty'], 'topicTags': problem['topicTags']})
+        elif slug in neetcode:
+            problems.append({'title': neetcode[slug]['title'], 'titleSlug': slug})
+        elif synced:
+            unknown.append(slug)
+        else:
+            problems.append({'title': slug.replace('-', ' ').title(), 'titleSlug': slug})
+    return problems, unknown
+
+
+def sync_catalog(catalog, page_size):
+    """
+    Pages through LeetCode's full problem list and replaces the local catalog.
+    A failed page aborts the sync and leaves the previous catalog in place.
+    """
+    problems, skip, total = [], 0, None
+    while total is None or skip < total:
+        page = leetcode_api.get_problem_list_page(skip, page_size)
+        if page is None:
+            return f"Problem catalog sync failed after {len(problems)} problems; the previous catalog was kept."
+        total, questions = page
+        if not questions:
+            break
+        for question in questions:
+            problems.append({
+                'title': question['title'], 'titleSlug': question['titleSlug'],
+                'difficulty': question.get('difficulty'), 'isPaidOnly': question.get('isPaidOnly', False),
+                'topicTags': [tag['slug'] for tag in question.get('topicTags') or []]
+            })
+        skip += len(questions)
+
+    if not problems:
+        return "Problem catalog sync returned no problems; the previous catalog was kept."
+    try:
+        catalog.replace(problems)
+    except Exception as e:
+        print(f"ERROR during problem catalog sync: {e}")
+        return f"An error occurred while writing the problem catalog: {e}"
+    catalog.refresh_search_index()
+    return f"Successfully synced {len(problems)} LeetCode problems!"
+
+
+def start_sync(catalog, page_size):
+    """Starts sync_catalog() in the background; returns False if one is already running in this worker."""
+    return background_jobs.start('sync_problem_catalog', sync_catalog, catalog, page_size)
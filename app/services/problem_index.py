@@ -0,0 +1,90 @@
+# ==============================================================================
+# Problem ID Interning & Solved Bitsets
+# ------------------------------------------------------------------------------
+# This file maps every problem slug we know about to a small integer ID, so a
+# user's solved problems can be held as a single Python int used as a bitset.
+# Progress maths (how many of a challenge's or a topic's problems a user has
+# solved) then becomes a popcount of a bitwise AND instead of set building.
+# IDs are only stable within one process; anything persisted stores slugs.
+# ==============================================================================
+
+import threading
+from app.services.firebase_service import NEETCODE_150_QUESTIONS
+
+_slug_to_id = {}
+_id_to_slug = []
+_lock = threading.Lock()
+
+
+def intern(slug):
+    """Returns the ID for a slug, assigning the next free one if it is new."""
+    problem_id = _slug_to_id.get(slug)
+    if problem_id is None:
+        with _lock:
+            problem_id = _slug_to_id.get(slug)
+            if problem_id is None:
+                problem_id = len(_id_to_slug)
+                _id_to_slug.append(slug)
+                _slug_to_id[slug] = problem_id
+    return problem_id
+
+
+def seed(slugs):
+    for slug in slugs:
+        intern(slug)
+
+
+def to_bitset(slugs):
+    bits = 0
+    for slug in slugs:
+        bits |= 1 << intern(slug)
+    return bits
+
+
+def problems_bitset(problems):
+    """Bitset of a list of problem dicts (challenge problems, study plan questions)."""
+    return to_bitset(problem['titleSlug'] for problem in problems if problem.get('titleSlug'))
+
+
+class SolvedSet:
+    """An immutable set of solved slugs backed by an integer bitset."""
+    __slots__ = ('bits',)
+
+    def __init__(self, bits=0):
+        self.bits = bits
+
+    @classmethod
+    def from_slugs(cls, slugs):
+        return cls(to_bitset(slugs))
+
+    def __contains__(self, slug):
+        problem_id = _slug_to_id.get(slug)
+        return problem_id is not None and (self.bits >> problem_id) & 1 == 1
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        bits, problem_id = self.bits, 0
+        while bits:
+            if bits & 1:
+                yield _id_to_slug[problem_id]
+            bits >>= 1
+            problem_id += 1
+
+    def union(self, slugs):
+        return SolvedSet(self.bits | to_bitset(slugs))
+
+    def difference(self, slugs):
+        """Returns the given slugs that are not in this set."""
+        return {slug for slug in slugs if slug not in self}
+
+    def count_common(self, bits):
+        """How many problems of another bitset are solved."""
+        return (self.bits & bits).bit_count()
+
+
+seed(question['titleSlug'] for question in NEETCODE_150_QUESTIONS)
@@ -0,0 +1,189 @@
+# ==============================================================================
+# Problem Search Index
+# ------------------------------------------------------------------------------
+# This file builds an in-memory search index over problem titles and slugs,
+# once at startup, for the challenge creation autocomplete. A query is looked
+# up through a sorted token list (prefix matches) and a trigram index
+# (substring and typo candidates), so its cost depends on the matches rather
+# than on the size of the problem set. Typo candidates are confirmed word by
+# word with an edit distance that counts a transposition as one edit. Results
+# are ranked exact > prefix > word prefix > substring > fuzzy.
+# ==============================================================================
+
+import re
+import threading
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+
+_EXACT, _PREFIX, _WORD_PREFIX, _SUBSTRING, _FUZZY = 5, 4, 3, 2, 1
+# Typo candidates (sharing the most trigrams with the query) checked by edit distance
+FUZZY_CANDIDATES = 200
+
+
+def normalize(text):
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', text.lower()).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def max_typos(word):
+    """Edits tolerated in a query word: none for very short words, more for long ones."""
+    return 0 if len(word) < 3 else 1 if len(word) < 8 else 2
+
+
+def edit_distance(a, b, limit):
+    """
+    Optimal string alignment distance between a and b, where swapping two
+    adjacent characters counts as one edit. Stops early and returns limit + 1
+    as soon as the distance is known to exceed limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class ProblemSearchIndex:
+    def __init__(self, problems):
+        self._problems = []
+        self._keys = []       # normalized (title, slug) per problem
+        self._tokens = []     # sorted (token, problem index) for bisect prefix lookups
+        self._postings = {}   # trigram -> set of problem indexes
+        self._words = []      # set of title and slug words per problem
+        self._trigram_counts = []
+        seen = set()
+        for problem in problems:
+            slug = problem.get('titleSlug')
+            if not slug or slug in seen:
+                continue
+            seen.add(slug)
+            index = len(self._problems)
+            title, slug_text = normalize(problem.get('title', slug)), normalize(slug)
+            self._problems.append({'title': problem.get('title', slug), 'titleSlug': slug})
+            self._keys.append((title, slug_text))
+            self._words.append(set(title.split()) | set(slug_text.split()))
+            for token in set(title.split()) | set(slug_text.split()) | {title, slug_text}:
+                self._tokens.append((token, index))
+            grams = _trigrams(title) | _trigrams(slug_text)
+            self._trigram_counts.append(len(grams))
+            for gram in grams:
+                self._postings.setdefault(gram, set()).add(index)
+        self._tokens.sort()
+        # Repeated keystrokes hit the same normalized queries, so memoize them.
+        self.search = lru_cache(maxsize=4096)(self._search)
+
+    def __len__(self):
+        return len(self._problems)
+
+    def _prefix_matches(self, query):
+        """Problem indexes with any token (or the whole title/slug) starting with query."""
+        matches = set()
+        position = bisect_left(self._tokens, (query, -1))
+        while position < len(self._tokens) and self._tokens[position][0].startswith(query):
+            matches.add(self._tokens[position][1])
+            position += 1
+        return matches
+
+    def _rank(self, index, query):
+        title, slug = self._keys[index]
+        if query in (title, slug):
+            return _EXACT
+        if title.startswith(query) or slug.startswith(query):
+            return _PREFIX
+        if any(word.startswith(query) for word in title.split()):
+            return _WORD_PREFIX
+        if query in title or query in slug:
+            return _SUBSTRING
+        return None
+
+    def _typo_cost(self, index, query_words):
+        """
+        Total edits needed to match every query word to a word of the problem,
+        or None if some word is too far off. The last query word may still be
+        being typed, so it is also compared against word prefixes.
+        """
+        total = 0
+        for position, token in enumerate(query_words):
+            allowed = max_typos(token)
+            last = position == len(query_words) - 1
+            best = allowed + 1
+            for word in self._words[index]:
+                if word == token or (last and word.startswith(token)):
+                    best = 0
+                    break
+                best = min(best, edit_distance(token, word, allowed))
+                if last and len(word) > len(token):
+                    best = min(best, edit_distance(token, word[:len(token)], allowed))
+            if best > allowed:
+                return None
+            total += best
+        return total
+
+    def _search(self, query, limit):
+        query = normalize(query)
+        if not query:
+            return []
+
+        scored = {}
+        for index in self._prefix_matches(query):
+            scored[index] = (self._rank(index, query) or _WORD_PREFIX, 1.0)
+
+        query_grams = _trigrams(query)
+        shared = Counter()
+        for gram in query_grams:
+            for index in self._postings.get(gram, ()):
+                shared[index] += 1
+        query_words = query.split()
+        checked = 0
+        for index, common in shared.most_common():
+            if index in scored:
+                continue
+            rank = self._rank(index, query)
+            similarity = common / (len(query_grams) + self._trigram_counts[index] - common)
+            if rank is not None:
+                scored[index] = (rank, similarity)
+                continue
+            if checked >= FUZZY_CANDIDATES:
+                continue
+            checked += 1
+            cost = self._typo_cost(index, query_words)
+            if cost is not None:
+                # Fewer edits first; trigram similarity (< 1) breaks ties
+                scored[index] = (_FUZZY, similarity - cost)
+
+        ranked = sorted(scored, key=lambda i: (-scored[i][0], -scored[i][1], len(self._keys[i][0]), self._keys[i][0]))
+        return [dict(self._problems[i]) for i in ranked[:limit]]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index(problems):
+    """(Re)builds the process-wide index, e.g. at startup or after a catalog sync."""
+    global _index
+    index = ProblemSearchIndex(problems)
+    with _index_lock:
+        _index = index
+    return index
+
+
+def search(query, limit=5):
+    """Returns up to 'limit' ranked {'title', 'titleSlug'} matches for query."""
+    if _index is None or not query:
+        return []
+    return _index.search(query, limit)
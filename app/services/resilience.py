@@ -0,0 +1,182 @@
+# ==============================================================================
+# Upstream Resilience Helpers
+# ------------------------------------------------------------------------------
+# This file contains the small building blocks that protect our workers from a
+# slow or failing leetcode.com: a circuit breaker that fails fast once errors
+# pile up, a retry budget that caps how many retries we add on top of normal
+# traffic, and a token-bucket rate limiter that keeps us under upstream limits.
+# Each takes an optional 'clock' (default time.time) so tests can drive time.
+# ==============================================================================
+
+import random
+import threading
+import time
+from collections import deque
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, error_threshold, min_requests, window_seconds, cooldown_seconds, clock=time.time):
+        self._clock = clock
+        self.error_threshold = error_threshold
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self._outcomes = deque()  # (timestamp, succeeded)
+        self._state = CLOSED
+        self._opened_at = None
+        self._probe_in_flight = False
+        self._probe_started = None
+        self._lock = threading.Lock()
+        self.rejected = self.times_opened = 0
+
+    def _trim(self, now):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def allow(self):
+        """Returns True if a request may go upstream right now."""
+        now = self._clock()
+        with self._lock:
+            if self._state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == CLOSED:
+                return True
+            # A probe that never reported back is given up on after another cooldown.
+            probe_lost = self._probe_in_flight and now - self._probe_started >= self.cooldown_seconds
+            if self._state == HALF_OPEN and (not self._probe_in_flight or probe_lost):
+                # Let exactly one probe through to test whether upstream recovered.
+                self._probe_in_flight = True
+                self._probe_started = now
+                return True
+            self.rejected += 1
+            return False
+
+    def cancel(self):
+        """Hands back a permission from allow() that went unused, so a half-open probe is not lost."""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self):
+        now = self._clock()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._probe_in_flight = False
+                self._outcomes.clear()
+            self._outcomes.append((now, True))
+            self._trim(now)
+
+    def record_failure(self):
+        now = self._clock()
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open(now)
+                return
+            self._outcomes.append((now, False))
+            self._trim(now)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            if (self._state == CLOSED and len(self._outcomes) >= self.min_requests
+                    and failures / len(self._outcomes) >= self.error_threshold):
+                self._open(now)
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self._probe_in_flight = False
+        self.times_opened += 1
+
+    def state(self):
+        now = self._clock()
+        with self._lock:
+            self._trim(now)
+            requests = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            return {
+                'state': self._state, 'requests_in_window': requests, 'failures_in_window': failures,
+                'error_rate': (failures / requests) if requests else 0.0,
+                'opened_at': self._opened_at, 'times_opened': self.times_opened, 'rejected': self.rejected
+            }
+
+
+class RetryBudget:
+    """
+    Allows retries only while they stay a small fraction of regular traffic:
+    every request deposits 'ratio' of a token, every retry spends a whole one,
+    and 'min_per_second' tokens trickle in so low traffic can still retry.
+    """
+
+    def __init__(self, ratio, min_per_second, max_tokens, clock=time.time):
+        self._clock = clock
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.retries = self.denied = 0
+
+    def _refill(self, now):
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def deposit(self):
+        with self._lock:
+            self._refill(self._clock())
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self):
+        with self._lock:
+            self._refill(self._clock())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.denied += 1
+            return False
+
+    def state(self):
+        with self._lock:
+            return {'tokens': round(self._tokens, 2), 'retries': self.retries, 'denied': self.denied}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.time, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.throttled = 0
+
+    def acquire(self, timeout):
+        """Takes one token, waiting up to 'timeout' seconds. Returns False if none became available."""
+        deadline = self._clock() + timeout
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                with self._lock:
+                    self.throttled += 1
+                return False
+            self._sleep(wait)
+
+    def state(self):
+        with self._lock:
+            return {'tokens': round(self._tokens, 2), 'rate': self.rate, 'throttled': self.throttled}
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """Exponential backoff with full jitter for the given (0-based) retry attempt."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
@@ -0,0 +1,138 @@
+# ==============================================================================
+# Shared Cache Backend
+# ------------------------------------------------------------------------------
+# This file provides an optional cache that every gunicorn worker on the same
+# host can read and write. It is a single SQLite file in WAL mode, so readers
+# never block each other and a value cached by one worker is a hit for all.
+# Values are stored as compact JSON, zlib-compressed when they are large.
+# ==============================================================================
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+_RAW, _COMPRESSED = b'j', b'z'
+
+
+def _encode(value, compress_threshold):
+    raw = json.dumps(value, separators=(',', ':')).encode('utf-8')
+    if len(raw) >= compress_threshold:
+        return _COMPRESSED + zlib.compress(raw)
+    return _RAW + raw
+
+
+def _decode(blob):
+    blob = bytes(blob)
+    raw = zlib.decompress(blob[1:]) if blob[:1] == _COMPRESSED else blob[1:]
+    return json.loads(raw)
+
+
+class SQLiteCache:
+    def __init__(self, path, max_entries, compress_threshold=512, evict_every=100):
+        self.path = path
+        self.max_entries = max_entries
+        self.compress_threshold = compress_threshold
+        self.evict_every = evict_every
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.errors = 0
+        self._execute(lambda conn: conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                soft_expiry REAL NOT NULL,
+                hard_expiry REAL NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+            """
+        ))
+
+    def _connection(self):
+        # sqlite3 connections can't cross threads or forks, so keep one per thread per process.
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _execute(self, operation, default=None):
+        try:
+            return operation(self._connection())
+        except Exception as e:
+            self.errors += 1
+            print(f"Shared Cache Error: {e}")
+            return default
+
+    def get(self, key):
+        """Returns (value, soft_expiry, hard_expiry) or None if absent or expired."""
+        now = time.time()
+
+        def operation(conn):
+            row = conn.execute(
+                'SELECT value, soft_expiry, hard_expiry, accessed FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, soft_expiry, hard_expiry, accessed = row
+            if now >= hard_expiry:
+                conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+                return None
+            # Only bump the LRU clock occasionally to keep reads mostly read-only.
+            if now - accessed > 60:
+                conn.execute('UPDATE cache SET accessed = ? WHERE key = ?', (now, key))
+            return _decode(value), soft_expiry, hard_expiry
+
+        entry = self._execute(operation)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, value, soft_ttl, hard_ttl):
+        now = time.time()
+        blob = _encode(value, self.compress_threshold)
+        self._execute(lambda conn: conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, soft_expiry, hard_expiry, accessed) VALUES (?, ?, ?, ?, ?)',
+            (key, blob, now + soft_ttl, now + max(hard_ttl, soft_ttl), now)
+        ))
+        with self._lock:
+            self._writes += 1
+            should_evict = self._writes % self.evict_every == 0
+        if should_evict:
+            self.evict()
+
+    def delete(self, key):
+        self._execute(lambda conn: conn.execute('DELETE FROM cache WHERE key = ?', (key,)))
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones above max_entries."""
+        def operation(conn):
+            removed = conn.execute('DELETE FROM cache WHERE hard_expiry <= ?', (time.time(),)).rowcount
+            count = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
+            if count > self.max_entries:
+                removed += conn.execute(
+                    'DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                    (count - self.max_entries,)
+                ).rowcount
+            return removed
+
+        removed = self._execute(operation, default=0)
+        with self._lock:
+            self.evictions += removed
+
+    def stats(self):
+        size = self._execute(lambda conn: conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0], default=0)
+        return {
+            'path': self.path, 'size': size, 'max_entries': self.max_entries,
+            'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'errors': self.errors
+        }
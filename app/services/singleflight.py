@@ -0,0 +1,60 @@
+# ==============================================================================
+# Request Coalescing
+# ------------------------------------------------------------------------------
+# This file lets concurrent callers asking for the same thing share a single
+# in-flight call: the first caller does the work and everyone else waiting on
+# the same key receives its result.
+# ==============================================================================
+
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.leaders = self.followers = 0
+
+    def do(self, key, func):
+        """
+        Runs func() for key unless an identical call is already running, in
+        which case it waits for that call and returns (or raises) its outcome.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.followers += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                is_leader = True
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            return {'in_flight': len(self._calls), 'leaders': self.leaders, 'followers': self.followers}
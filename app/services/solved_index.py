@@ -0,0 +1,145 @@
+# ==============================================================================
+# Solved Problem Index
+# ------------------------------------------------------------------------------
+# This file keeps a persistent, ever-growing set of each user's accepted
+# problem slugs in Firestore. LeetCode only exposes a short window of recent
+# submissions, so every sync folds in the submissions newer than the stored
+# high-water mark; solves that later scroll out of that window are kept.
+# When a user's set grows, their materialized challenge progress is updated.
+# Pages that show other users' progress call sync_users, which re-syncs anyone
+# this worker has not synced within SOLVED_INDEX_SYNC_TTL.
+# ==============================================================================
+
+import threading
+from flask import current_app
+from app.services import challenge_progress, fanout, firebase_service, leetcode_api
+from app.services.cache import TTLCache, FRESH
+from app.services.problem_index import SolvedSet
+
+# Per-worker copy of each index we have recently read or written, so repeated
+# syncs skip the Firestore read: username -> (SolvedSet, mark). Entries expire
+# after SOLVED_INDEX_CACHE_TTL, so solves another worker stored are picked up.
+_known_indexes = None
+# Users this worker synced from LeetCode within SOLVED_INDEX_SYNC_TTL
+_recent_syncs = None
+_lock = threading.Lock()
+
+
+def _get_known_indexes():
+    global _known_indexes
+    if _known_indexes is None:
+        with _lock:
+            if _known_indexes is None:
+                ttl = current_app.config['SOLVED_INDEX_CACHE_TTL']
+                # Local only: SolvedSet bit positions are not stable across processes
+                _known_indexes = TTLCache('solved_index', ttl, ttl,
+                                          current_app.config['SOLVED_INDEX_CACHE_MAX_ENTRIES'])
+    return _known_indexes
+
+
+def _get_recent_syncs():
+    global _recent_syncs
+    if _recent_syncs is None:
+        with _lock:
+            if _recent_syncs is None:
+                ttl = current_app.config['SOLVED_INDEX_SYNC_TTL']
+                _recent_syncs = TTLCache('solved_index_syncs', ttl, ttl,
+                                         current_app.config['SOLVED_INDEX_CACHE_MAX_ENTRIES'])
+    return _recent_syncs
+
+
+def _remember(username, index):
+    """Caches a stored index document and returns it as (SolvedSet, mark)."""
+    index = index or {}
+    known = (SolvedSet.from_slugs(index.get('slugs', [])), index.get('high_water_mark', 0))
+    _get_known_indexes().set(username, known)
+    return known
+
+
+def _load_index(username):
+    known, state = _get_known_indexes().lookup(username)
+    if state == FRESH:
+        return known
+    return _remember(username, firebase_service.get_solved_index(username))
+
+
+def get_stored_solved_many(usernames):
+    """
+    Reads users' stored solved slug sets straight from Firestore (in one
+    batched read), without contacting LeetCode. Used on write paths, where
+    another worker may have synced a user more recently than our copy.
+    Returns {username: SolvedSet}.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    return {username: _remember(username, index)[0]
+            for username, index in zip(usernames, firebase_service.get_solved_indexes(usernames))}
+
+
+def _overflows(submissions, limit, high_water_mark):
+    """True if a full window is entirely newer than the mark, so older solves may lie beyond it."""
+    return len(submissions) >= limit and min(int(sub['timestamp']) for sub in submissions) > high_water_mark
+
+
+def _newer_submissions(username, high_water_mark):
+    """
+    Returns (submissions newer than the high-water mark, complete). They are
+    sliced from the user's cached snapshot; if its whole window is newer than
+    the mark, one wider uncached fetch follows. 'complete' is False if even
+    that window does not reach back to the mark.
+    """
+    config = current_app.config
+    limit = config['LEETCODE_SNAPSHOT_SUBMISSIONS']
+    submissions = leetcode_api.get_recent_submissions(username, limit)
+    if _overflows(submissions, limit, high_water_mark):
+        wider = leetcode_api.fetch_recent_submissions(username, config['SOLVED_INDEX_WIDE_WINDOW'])
+        if wider is not None:
+            submissions, limit = wider, config['SOLVED_INDEX_WIDE_WINDOW']
+    newer = [sub for sub in submissions if int(sub['timestamp']) > high_water_mark]
+    return newer, not _overflows(submissions, limit, high_water_mark)
+
+
+def sync_user(username):
+    """
+    Folds a user's new accepted submissions into their stored index and
+    returns the complete set of solved slugs as a SolvedSet.
+    """
+    solved, high_water_mark = _load_index(username)
+    newer, complete = _newer_submissions(username, high_water_mark)
+    _get_recent_syncs().set(username, True)
+    if not newer:
+        return solved
+
+    new_slugs = solved.difference({sub['titleSlug'] for sub in newer if sub['statusDisplay'] == 'Accepted'})
+    timestamps = [int(sub['timestamp']) for sub in newer]
+    if complete:
+        new_mark = max(timestamps)
+    else:
+        # Submissions between the old mark and this window were never seen; only claim what was
+        new_mark = min(timestamps)
+        if high_water_mark:
+            print(f"Solved Index Warning for {username}: submissions between {high_water_mark} "
+                  f"and {new_mark} fell outside the fetched window")
+    stored = firebase_service.update_solved_index(username, new_slugs, new_mark)
+    if stored is None:
+        return solved.union(new_slugs)
+
+    # The stored document also holds solves other workers added since our copy was read
+    solved = _remember(username, stored)[0]
+    if new_slugs:
+        challenge_progress.apply_solved_update(username, solved)
+    return solved
+
+
+def sync_users(usernames):
+    """
+    Concurrently syncs the users this worker has not synced within
+    SOLVED_INDEX_SYNC_TTL and returns {username: SolvedSet} for those it
+    synced. Everyone else's stored index is at most that old (plus the
+    snapshot cache's staleness), which bounds how stale their progress is.
+    """
+    recent_syncs = _get_recent_syncs()
+    due = [username for username in dict.fromkeys(usernames) if recent_syncs.needs_refresh(username, 0)]
+    if not due:
+        return {}
+    return fanout.fan_out(sync_user, due, default=SolvedSet(),
+                          timeout=current_app.config['LEETCODE_FANOUT_TIMEOUT'])
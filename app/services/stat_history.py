@@ -0,0 +1,122 @@
+# ==============================================================================
+# Daily Stat Snapshots
+# ------------------------------------------------------------------------------
+# This file records one snapshot per user per day of their solved counts and
+# streak, so pages can chart progress over time. A user's year is stored as a
+# single Firestore document holding a packed columnar array: one uint16 column
+# per metric with a slot for every day of the year. Reading any date range
+# costs one document read per calendar year it spans. Snapshots are taken
+# whenever fresh stats arrive, plus once a day for every registered user by a
+# scheduled job; days that still have none show up as gaps in the chart.
+# ==============================================================================
+
+import datetime
+from flask import current_app
+from app.services import background_jobs, fanout, firebase_service, leetcode_api
+from app.services.cache import ChangeTracker
+from app.services.packed_days import MAX_VALUE, days_in_year, day_of_year, doc_id, pack, slot_date, unpack
+
+SNAPSHOT_FIELDS = ('totalSolved', 'easySolved', 'mediumSolved', 'hardSolved', 'streak')
+# Marks a day without a snapshot
+_MISSING = MAX_VALUE
+_written_snapshots = ChangeTracker()
+
+
+def _unpack(blob, year):
+    """Returns the year's columns as one flat uint16 array, column by column."""
+    return unpack(blob, len(SNAPSHOT_FIELDS) * days_in_year(year), fill=_MISSING)
+
+
+def _write_snapshot(username, day, values):
+    days = days_in_year(day.year)
+    slot = day_of_year(day)
+
+    def mutate(current):
+        columns = _unpack((current or {}).get('columns'), day.year)
+        if all(columns[i * days + slot] == value for i, value in enumerate(values)):
+            return None
+        for i, value in enumerate(values):
+            columns[i * days + slot] = value
+        return {'username': username, 'year': day.year, 'columns': pack(columns)}
+
+    firebase_service.update_stat_history(doc_id(username, day.year), mutate)
+
+
+def _write_snapshots(snapshots):
+    for username, (day, values) in snapshots.items():
+        try:
+            _write_snapshot(username, day, values)
+        except Exception as e:
+            print(f"Stat History Error for {username}: {e}")
+
+
+def _changed_snapshots(results):
+    """Today's snapshot for every user in {username: stats} whose numbers changed."""
+    today = datetime.date.today()
+    changed = {}
+    for username, stats in results.items():
+        if not stats:
+            continue
+        values = tuple(min(int(stats.get(field) or 0), _MISSING - 1) for field in SNAPSHOT_FIELDS)
+        if _written_snapshots.changed(username, (today, values)):
+            changed[username] = (today, values)
+    return changed
+
+
+def record_stats(results):
+    """
+    Called with freshly fetched {username: stats}. Stores today's snapshot
+    for every user whose numbers changed, in the background.
+    """
+    changed = _changed_snapshots(results)
+    if not changed:
+        return
+    try:
+        fanout.submit_background(_write_snapshots, changed)
+    except Exception as e:
+        print(f"Stat History Error: {e}")
+
+
+def snapshot_all():
+    """
+    Daily job: stores today's snapshot for every registered user, including
+    those who have not opened the site, one fan-out batch at a time.
+    """
+    usernames = firebase_service.get_all_usernames()
+    chunk_size = current_app.config['LEETCODE_BATCH_SIZE'] * current_app.config['LEETCODE_MAX_CONCURRENCY']
+    written = 0
+    for i in range(0, len(usernames), chunk_size):
+        all_stats = leetcode_api.get_user_stats_many(usernames[i:i + chunk_size])
+        changed = _changed_snapshots(all_stats)
+        _write_snapshots(changed)
+        written += len(changed)
+    return f"Stored {written} daily stat snapshots for {len(usernames)} registered users."
+
+
+def start_daily_snapshots():
+    """Starts snapshot_all() in the background; returns False if it is already running in this worker."""
+    return background_jobs.start('daily_stat_snapshots', snapshot_all)
+
+
+def get_range(username, start, end):
+    """
+    Returns the user's snapshots between two dates (inclusive) as columns:
+    {'dates': [...], 'totalSolved': [...], ...}. The series starts at the
+    first snapshot in range; later days without one hold None (a chart gap).
+    """
+    years = list(range(start.year, end.year + 1))
+    docs = firebase_service.get_stat_histories([doc_id(username, year) for year in years])
+    series = {'dates': [], **{field: [] for field in SNAPSHOT_FIELDS}}
+    for year, doc in zip(years, docs):
+        columns = _unpack(doc.get('columns'), year) if doc else None
+        days = days_in_year(year)
+        first = (max(start, datetime.date(year, 1, 1)) - datetime.date(year, 1, 1)).days
+        last = (min(end, datetime.date(year, 12, 31)) - datetime.date(year, 1, 1)).days
+        for slot in range(first, last + 1):
+            missing = columns is None or columns[slot] == _MISSING
+            if missing and not series['dates']:
+                continue
+            series['dates'].append(slot_date(year, slot).isoformat())
+            for i, field in enumerate(SNAPSHOT_FIELDS):
+                series[field].append(None if missing else columns[i * days + slot])
+    return series
@@ -0,0 +1,162 @@
+# ==============================================================================
+# Submission Calendar
+# ------------------------------------------------------------------------------
+# This file keeps each user's daily submission counts (LeetCode's
+# 'submissionCalendar') as one packed uint16 array per user per year in
+# Firestore. Every stats refresh merges the fresh calendar in, so days that
+# have scrolled out of LeetCode's rolling one-year window are kept. The
+# arrays drive the activity heatmaps, and the current streak is computed
+# from the day counts instead of with a separate GraphQL request. Cached
+# stats carry the calendar packed the same way (see pack_days), never as
+# LeetCode's much larger JSON string.
+# ==============================================================================
+
+import base64
+import datetime
+import json
+from array import array
+from app.services import fanout, firebase_service
+from app.services.cache import ChangeTracker
+from app.services.packed_days import MAX_VALUE, days_in_year, day_of_year, doc_id, pack, slot_date, unpack
+
+# Heatmap colour level thresholds: a day with at least N submissions gets level i+1
+HEATMAP_LEVELS = (1, 3, 6, 10)
+_merged_calendars = ChangeTracker()
+
+
+def parse(submission_calendar):
+    """Turns LeetCode's {"<unix midnight UTC>": count} (often a JSON string) into {date: count}."""
+    if not submission_calendar:
+        return {}
+    if isinstance(submission_calendar, str):
+        try:
+            submission_calendar = json.loads(submission_calendar)
+        except ValueError:
+            return {}
+    days = {}
+    for timestamp, count in submission_calendar.items():
+        day = datetime.datetime.fromtimestamp(int(timestamp), datetime.timezone.utc).date()
+        days[day] = days.get(day, 0) + int(count)
+    return days
+
+
+def pack_days(day_counts):
+    """
+    Packs {date: count} into the JSON-safe form kept in cached stats:
+    {'start': ordinal of the first active day, 'counts': base64 of the
+    uint16 counts from there to the last active day}, or None if empty.
+    """
+    if not day_counts:
+        return None
+    first = min(day_counts)
+    counts = array('H', [0]) * ((max(day_counts) - first).days + 1)
+    for day, count in day_counts.items():
+        counts[(day - first).days] = min(count, MAX_VALUE)
+    return {'start': first.toordinal(), 'counts': base64.b64encode(pack(counts)).decode('ascii')}
+
+
+def unpack_days(packed):
+    """Inverse of pack_days; returns {date: count} for the days with submissions."""
+    if not packed:
+        return {}
+    try:
+        blob = base64.b64decode(packed['counts'])
+        first = datetime.date.fromordinal(packed['start'])
+    except (KeyError, TypeError, ValueError):
+        return {}
+    counts = unpack(blob, len(blob) // 2)
+    return {first + datetime.timedelta(days=i): count for i, count in enumerate(counts) if count}
+
+
+def current_streak(day_counts, today=None):
+    """Consecutive days with a submission, ending today (or yesterday if today has none yet)."""
+    today = today or datetime.datetime.now(datetime.timezone.utc).date()
+    day = today if day_counts.get(today) else today - datetime.timedelta(days=1)
+    streak = 0
+    while day_counts.get(day):
+        streak += 1
+        day -= datetime.timedelta(days=1)
+    return streak
+
+
+def _merge_year(username, year, days):
+    """Folds {slot: count} into the stored year, keeping the larger count per day."""
+    def mutate(current):
+        counts = unpack((current or {}).get('counts'), days_in_year(year))
+        changed = False
+        for slot, count in days.items():
+            count = min(count, MAX_VALUE)
+            if count > counts[slot]:
+                counts[slot] = count
+                changed = True
+        if not changed:
+            return None
+        return {'username': username, 'year': year, 'counts': pack(counts)}
+
+    firebase_service.update_submission_calendar(doc_id(username, year), mutate)
+
+
+def _merge_calendars(calendars):
+    for username, day_counts in calendars.items():
+        by_year = {}
+        for day, count in day_counts.items():
+            by_year.setdefault(day.year, {})[day_of_year(day)] = count
+        for year, days in by_year.items():
+            try:
+                _merge_year(username, year, days)
+            except Exception as e:
+                print(f"Submission Calendar Error for {username}: {e}")
+
+
+def record_stats(results):
+    """
+    Called with freshly fetched {username: stats}. Merges each changed
+    calendar into the stored per-year arrays in the background.
+    """
+    changed = {}
+    for username, stats in results.items():
+        day_counts = unpack_days((stats or {}).get('calendarDays'))
+        if day_counts and _merged_calendars.changed(username, (max(day_counts), sum(day_counts.values()))):
+            changed[username] = day_counts
+    if not changed:
+        return
+    try:
+        fanout.submit_background(_merge_calendars, changed)
+    except Exception as e:
+        print(f"Submission Calendar Error: {e}")
+
+
+def get_years(usernames, year, stats_by_user=None):
+    """
+    Returns {username: {date: count}} for one year, from one batched read of
+    the stored arrays. Fresh stats passed in are merged on top, so the result
+    is current even before the background merge has landed.
+    """
+    usernames = list(dict.fromkeys(usernames))
+    docs = firebase_service.get_submission_calendars([doc_id(username, year) for username in usernames])
+    results = {}
+    for username, doc in zip(usernames, docs):
+        counts = unpack((doc or {}).get('counts'), days_in_year(year))
+        day_counts = {slot_date(year, slot): count for slot, count in enumerate(counts) if count}
+        fresh = unpack_days(((stats_by_user or {}).get(username) or {}).get('calendarDays'))
+        for day, count in fresh.items():
+            if day.year == year and count > day_counts.get(day, 0):
+                day_counts[day] = count
+        results[username] = day_counts
+    return results
+
+
+def heatmap(day_counts, year):
+    """
+    Lays a year out as GitHub-style columns of weeks (Sunday first). Each
+    cell is {'date', 'count', 'level'} or None for padding before Jan 1.
+    """
+    first = datetime.date(year, 1, 1)
+    # Python's weekday() is Monday=0; shift so Sunday starts each week column.
+    cells = [None] * ((first.weekday() + 1) % 7)
+    for slot in range(days_in_year(year)):
+        day = slot_date(year, slot)
+        count = day_counts.get(day, 0)
+        level = sum(1 for threshold in HEATMAP_LEVELS if count >= threshold)
+        cells.append({'date': day.isoformat(), 'count': count, 'level': level})
+    return [cells[i:i + 7] for i in range(0, len(cells), 7)]
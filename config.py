@@ -7,6 +7,74 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY')
     FIREBASE_CREDENTIALS_PATH = os.environ.get('FIREBASE_CREDENTIALS_PATH')
     LEETCODE_API_ENDPOINT = 'https://leetcode.com/graphql'
+    # Shared LeetCode HTTP client (connection pool + per-phase timeouts, in seconds)
+    LEETCODE_HTTP2 = os.environ.get('LEETCODE_HTTP2', 'True') == 'True'
+    LEETCODE_POOL_MAX_CONNECTIONS = int(os.environ.get('LEETCODE_POOL_MAX_CONNECTIONS') or 20)
+    LEETCODE_POOL_MAX_KEEPALIVE = int(os.environ.get('LEETCODE_POOL_MAX_KEEPALIVE') or 10)
+    LEETCODE_KEEPALIVE_EXPIRY = float(os.environ.get('LEETCODE_KEEPALIVE_EXPIRY') or 30.0)
+    LEETCODE_CONNECT_TIMEOUT = float(os.environ.get('LEETCODE_CONNECT_TIMEOUT') or 5.0)
+    LEETCODE_READ_TIMEOUT = float(os.environ.get('LEETCODE_READ_TIMEOUT') or 15.0)
+    LEETCODE_WRITE_TIMEOUT = float(os.environ.get('LEETCODE_WRITE_TIMEOUT') or 5.0)
+    LEETCODE_POOL_TIMEOUT = float(os.environ.get('LEETCODE_POOL_TIMEOUT') or 5.0)
+    # Number of users packed into one aliased GraphQL document
+    LEETCODE_BATCH_SIZE = int(os.environ.get('LEETCODE_BATCH_SIZE') or 10)
+    # Per-worker cap on concurrent LeetCode lookups and the wait for a whole fan-out
+    LEETCODE_MAX_CONCURRENCY = int(os.environ.get('LEETCODE_MAX_CONCURRENCY') or 8)
+    LEETCODE_FANOUT_TIMEOUT = float(os.environ.get('LEETCODE_FANOUT_TIMEOUT') or 20.0)
+    # Per-worker threads for fire-and-forget background work, kept apart from the fan-out pool
+    BACKGROUND_MAX_WORKERS = int(os.environ.get('BACKGROUND_MAX_WORKERS') or 2)
+    # In-process LeetCode cache: (soft TTL, hard TTL) in seconds per data type
+    LEETCODE_CACHE_TTLS = {
+        'stats': (300, 3600),
+        'snapshot': (120, 1800),
+    }
+    # Recent submissions fetched with each user snapshot: the largest window any page needs
+    LEETCODE_SNAPSHOT_SUBMISSIONS = int(os.environ.get('LEETCODE_SNAPSHOT_SUBMISSIONS') or 100)
+    LEETCODE_CACHE_MAX_ENTRIES = int(os.environ.get('LEETCODE_CACHE_MAX_ENTRIES') or 2048)
+    # Optional cache shared by all workers on a host (SQLite file); disabled when unset
+    SHARED_CACHE_PATH = os.environ.get('SHARED_CACHE_PATH')
+    SHARED_CACHE_MAX_ENTRIES = int(os.environ.get('SHARED_CACHE_MAX_ENTRIES') or 20000)
+    # Protection against a slow or failing leetcode.com
+    LEETCODE_BREAKER_ERROR_THRESHOLD = float(os.environ.get('LEETCODE_BREAKER_ERROR_THRESHOLD') or 0.5)
+    LEETCODE_BREAKER_MIN_REQUESTS = int(os.environ.get('LEETCODE_BREAKER_MIN_REQUESTS') or 10)
+    LEETCODE_BREAKER_WINDOW = float(os.environ.get('LEETCODE_BREAKER_WINDOW') or 60.0)
+    LEETCODE_BREAKER_COOLDOWN = float(os.environ.get('LEETCODE_BREAKER_COOLDOWN') or 30.0)
+    LEETCODE_MAX_RETRIES = int(os.environ.get('LEETCODE_MAX_RETRIES') or 2)
+    LEETCODE_RETRY_BASE_DELAY = float(os.environ.get('LEETCODE_RETRY_BASE_DELAY') or 0.2)
+    LEETCODE_RETRY_MAX_DELAY = float(os.environ.get('LEETCODE_RETRY_MAX_DELAY') or 2.0)
+    LEETCODE_RETRY_BUDGET_RATIO = float(os.environ.get('LEETCODE_RETRY_BUDGET_RATIO') or 0.1)
+    LEETCODE_RETRY_BUDGET_MIN_PER_SECOND = float(os.environ.get('LEETCODE_RETRY_BUDGET_MIN_PER_SECOND') or 0.5)
+    LEETCODE_RETRY_BUDGET_MAX_TOKENS = float(os.environ.get('LEETCODE_RETRY_BUDGET_MAX_TOKENS') or 10)
+    LEETCODE_RATE_LIMIT_PER_SECOND = float(os.environ.get('LEETCODE_RATE_LIMIT_PER_SECOND') or 10.0)
+    LEETCODE_RATE_LIMIT_BURST = int(os.environ.get('LEETCODE_RATE_LIMIT_BURST') or 20)
+    LEETCODE_RATE_LIMIT_WAIT = float(os.environ.get('LEETCODE_RATE_LIMIT_WAIT') or 2.0)
+    # Per-worker copies of users' stored solved indexes, re-read from Firestore after the TTL
+    SOLVED_INDEX_CACHE_TTL = int(os.environ.get('SOLVED_INDEX_CACHE_TTL') or 60)
+    SOLVED_INDEX_CACHE_MAX_ENTRIES = int(os.environ.get('SOLVED_INDEX_CACHE_MAX_ENTRIES') or 2048)
+    # Pages re-sync other users' solved indexes from LeetCode once they are this old (seconds)
+    SOLVED_INDEX_SYNC_TTL = int(os.environ.get('SOLVED_INDEX_SYNC_TTL') or 300)
+    # Submissions fetched when a whole snapshot window is newer than a user's high-water mark
+    SOLVED_INDEX_WIDE_WINDOW = int(os.environ.get('SOLVED_INDEX_WIDE_WINDOW') or 500)
+    # Rank/solved-count points kept per member for the leaderboard trend chart
+    LEADERBOARD_HISTORY_MAX_POINTS = int(os.environ.get('LEADERBOARD_HISTORY_MAX_POINTS') or 90)
+    # Global ranking of all registered users (Fenwick trees over solved counts)
+    GLOBAL_RANKING_MAX_SOLVED = int(os.environ.get('GLOBAL_RANKING_MAX_SOLVED') or 5000)
+    GLOBAL_RANKING_SYNC_INTERVAL = int(os.environ.get('GLOBAL_RANKING_SYNC_INTERVAL') or 60)
+    GLOBAL_RANKING_META_DEBOUNCE = float(os.environ.get('GLOBAL_RANKING_META_DEBOUNCE') or 10.0)
+    GLOBAL_RANKING_PAGE_SIZE = int(os.environ.get('GLOBAL_RANKING_PAGE_SIZE') or 50)
+    # Days of daily stat snapshots shown on the dashboard trend chart
+    STAT_HISTORY_DASHBOARD_DAYS = int(os.environ.get('STAT_HISTORY_DASHBOARD_DAYS') or 90)
+    # Local mirror of LeetCode's problem list, synced via /sync-problem-catalog
+    PROBLEM_CATALOG_PATH = os.environ.get('PROBLEM_CATALOG_PATH') or 'problem_catalog.db'
+    PROBLEM_CATALOG_MMAP_SIZE = int(os.environ.get('PROBLEM_CATALOG_MMAP_SIZE') or 64 * 1024 * 1024)
+    PROBLEM_CATALOG_PAGE_SIZE = int(os.environ.get('PROBLEM_CATALOG_PAGE_SIZE') or 100)
+    # Background warming of recently active users' LeetCode data
+    CACHE_WARMER_ENABLED = os.environ.get('CACHE_WARMER_ENABLED', 'True') == 'True'
+    CACHE_WARMER_INTERVAL = int(os.environ.get('CACHE_WARMER_INTERVAL') or 60)
+    CACHE_WARMER_ACTIVE_WINDOW = int(os.environ.get('CACHE_WARMER_ACTIVE_WINDOW') or 1800)
+    CACHE_WARMER_MAX_USERS = int(os.environ.get('CACHE_WARMER_MAX_USERS') or 200)
+    CACHE_WARMER_BUDGET_PER_MINUTE = int(os.environ.get('CACHE_WARMER_BUDGET_PER_MINUTE') or 30)
+    CACHE_WARMER_FRIENDS_TTL = int(os.environ.get('CACHE_WARMER_FRIENDS_TTL') or 600)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT') or 587)
     MAIL_USE_SSL = os.environ.get('MAIL_USE_SSL', 'False') == 'True'
@@ -15,3 +83,17 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
     MAIL_DEFAULT_SENDER = os.environ.get('MAIL_DEFAULT_SENDER')
     MAIL_DEBUG = os.environ.get('MAIL_DEBUG') is not None
+    # Background email delivery (worker threads with persistent SMTP connections)
+    MAIL_QUEUE_ENABLED = os.environ.get('MAIL_QUEUE_ENABLED', 'True') == 'True'
+    MAIL_QUEUE_WORKERS = int(os.environ.get('MAIL_QUEUE_WORKERS') or 2)
+    MAIL_QUEUE_MAX_SIZE = int(os.environ.get('MAIL_QUEUE_MAX_SIZE') or 1000)
+    MAIL_MAX_RETRIES = int(os.environ.get('MAIL_MAX_RETRIES') or 3)
+    MAIL_RETRY_BASE_DELAY = float(os.environ.get('MAIL_RETRY_BASE_DELAY') or 1.0)
+    MAIL_RETRY_MAX_DELAY = float(os.environ.get('MAIL_RETRY_MAX_DELAY') or 30.0)
+    MAIL_CONNECTION_IDLE_TIMEOUT = float(os.environ.get('MAIL_CONNECTION_IDLE_TIMEOUT') or 60.0)
+    # Challenge notifications: minimum seconds between two of the same kind per recipient
+    NOTIFICATION_DEDUP_WINDOWS = {
+        'challenge_invite': 86400,
+        'expiring_digest': 20 * 3600,
+    }
+    CHALLENGE_DIGEST_HORIZON_HOURS = int(os.environ.get('CHALLENGE_DIGEST_HORIZON_HOURS') or 24)
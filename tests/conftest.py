@@ -0,0 +1,19 @@
+import pytest
+
+
+class FakeClock:
+    """Stands in for time.time / time.sleep; time only moves when a test says so."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
@@ -0,0 +1,77 @@
+from app.services.cache import FRESH, MISS, STALE, ChangeTracker, TTLCache
+
+
+def make_cache(clock, **kwargs):
+    options = {'soft_ttl': 10, 'hard_ttl': 60, 'max_entries': 3}
+    options.update(kwargs)
+    return TTLCache('test', clock=clock.time, **options)
+
+
+def test_entries_go_stale_after_the_soft_ttl_and_expire_after_the_hard_ttl(clock):
+    ttl_cache = make_cache(clock)
+    ttl_cache.set('a', 1)
+    assert ttl_cache.lookup('a') == (1, FRESH)
+    clock.now += 10
+    assert ttl_cache.lookup('a') == (1, STALE)
+    clock.now += 50
+    assert ttl_cache.lookup('a') == (None, MISS)
+    assert ttl_cache.keys() == []
+
+
+def test_least_recently_used_entry_is_evicted_first(clock):
+    ttl_cache = make_cache(clock)
+    for key in 'abc':
+        ttl_cache.set(key, key)
+    ttl_cache.lookup('a')  # 'b' is now the oldest
+    ttl_cache.set('d', 'd')
+    assert sorted(ttl_cache.keys()) == ['a', 'c', 'd']
+    assert ttl_cache.stats()['evictions'] == 1
+
+
+def test_hard_ttl_is_never_shorter_than_the_soft_ttl(clock):
+    ttl_cache = make_cache(clock, soft_ttl=30, hard_ttl=5)
+    assert ttl_cache.hard_ttl == 30
+
+
+def test_get_or_load_serves_stale_values_while_refreshing(clock):
+    scheduled = []
+    ttl_cache = make_cache(clock, schedule=lambda func, *args: scheduled.append((func, args)))
+    assert ttl_cache.get_or_load('a', lambda: 1) == 1
+    clock.now += 15
+    assert ttl_cache.get_or_load('a', lambda: 2) == 1
+    assert ttl_cache.get_or_load('a', lambda: 3) == 1
+    assert len(scheduled) == 1  # only one refresh is claimed at a time
+    func, args = scheduled[0]
+    func(*args)
+    assert ttl_cache.lookup('a') == (2, FRESH)
+
+
+def test_failed_loads_are_not_cached(clock):
+    ttl_cache = make_cache(clock)
+    assert ttl_cache.get_or_load('a', lambda: None) is None
+    assert ttl_cache.lookup('a') == (None, MISS)
+
+
+def test_needs_refresh_looks_ahead(clock):
+    ttl_cache = make_cache(clock)
+    assert ttl_cache.needs_refresh('a', 0)
+    ttl_cache.set('a', 1)
+    assert not ttl_cache.needs_refresh('a', 5)
+    assert ttl_cache.needs_refresh('a', 10)
+
+
+def test_change_tracker_skips_repeated_values_until_they_expire(clock):
+    tracker = ChangeTracker(max_entries=2, ttl=60, clock=clock.time)
+    assert tracker.changed('a', 1)
+    assert not tracker.changed('a', 1)
+    assert tracker.changed('a', 2)
+    clock.now += 60
+    assert tracker.changed('a', 2)
+
+
+def test_change_tracker_is_bounded(clock):
+    tracker = ChangeTracker(max_entries=2, ttl=60, clock=clock.time)
+    for key in 'abc':
+        tracker.changed(key, 1)
+    assert tracker.changed('a', 1)  # evicted, so it counts as changed again
+    assert not tracker.changed('c', 1)
@@ -0,0 +1,69 @@
+import random
+
+from app.services.global_ranking import FenwickTree, RankingIndex
+
+
+def test_fenwick_prefix_sums_match_a_plain_list():
+    rng = random.Random(7)
+    values = [0] * 50
+    tree = FenwickTree(50)
+    for _ in range(200):
+        position, delta = rng.randrange(50), rng.randint(0, 3)
+        values[position] += delta
+        tree.add(position, delta)
+    for position in range(-1, 55):
+        assert tree.prefix_sum(position) == sum(values[:max(0, position + 1)])
+
+
+def test_fenwick_find_by_order():
+    tree = FenwickTree(10)
+    for position in (2, 2, 5, 9):
+        tree.add(position, 1)
+    assert [tree.find_by_order(k) for k in (1, 2, 3, 4)] == [2, 2, 5, 9]
+
+
+def make_index():
+    index = RankingIndex(max_score=100)
+    index.set('ann', (50, 20, 20, 10))
+    index.set('bob', (80, 30, 40, 10))
+    index.set('cat', (50, 10, 30, 10))
+    index.set('dan', (10, 10, 0, 0))
+    return index
+
+
+def test_rank_counts_strictly_higher_scores():
+    index = make_index()
+    assert index.rank('bob', 'totalSolved') == 1
+    assert index.rank('ann', 'totalSolved') == 2
+    assert index.rank('cat', 'totalSolved') == 2
+    assert index.rank('dan', 'totalSolved') == 4
+    assert index.rank('eve', 'totalSolved') is None
+
+
+def test_percentile():
+    index = make_index()
+    assert index.percentile('bob', 'totalSolved') == 75.0
+    assert index.percentile('dan', 'totalSolved') == 0.0
+
+
+def test_top_pages_through_ties_in_username_order():
+    index = make_index()
+    assert index.top('totalSolved', 0, 10) == [(1, 'bob', 80), (2, 'ann', 50), (2, 'cat', 50), (4, 'dan', 10)]
+    assert index.top('totalSolved', 2, 2) == [(2, 'cat', 50), (4, 'dan', 10)]
+    assert index.top('totalSolved', 4, 2) == []
+
+
+def test_set_moves_and_remove_drops_users():
+    index = make_index()
+    assert not index.set('dan', (10, 10, 0, 0))
+    assert index.set('dan', (90, 10, 40, 40))
+    assert index.rank('dan', 'totalSolved') == 1
+    index.remove('bob')
+    assert 'bob' not in index and len(index) == 3
+    assert index.top('totalSolved', 0, 2) == [(1, 'dan', 90), (2, 'ann', 50)]
+
+
+def test_scores_are_clamped_to_the_index_range():
+    index = RankingIndex(max_score=10)
+    index.set('big', (500, 0, 0, 0))
+    assert index.top('totalSolved', 0, 1) == [(1, 'big', 10)]
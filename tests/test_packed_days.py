@@ -0,0 +1,44 @@
+import datetime
+from array import array
+
+from app.services import packed_days, submission_calendar
+
+
+def test_pack_round_trips_through_unpack():
+    values = array('H', [0, 1, 300, packed_days.MAX_VALUE])
+    assert packed_days.unpack(packed_days.pack(values), 4) == values
+
+
+def test_unpack_falls_back_to_a_filled_array_for_missing_or_malformed_blobs():
+    assert packed_days.unpack(None, 3, fill=7) == array('H', [7, 7, 7])
+    assert packed_days.unpack(b'\x01\x00', 3) == array('H', [0, 0, 0])
+
+
+def test_day_slots_cover_leap_years():
+    assert packed_days.days_in_year(2024) == 366
+    assert packed_days.days_in_year(2026) == 365
+    last = datetime.date(2024, 12, 31)
+    assert packed_days.day_of_year(last) == 365
+    assert packed_days.slot_date(2024, 365) == last
+
+
+def test_doc_id_is_per_user_and_year():
+    assert packed_days.doc_id('alice', 2026) == 'alice_2026'
+
+
+def test_calendar_days_round_trip():
+    day_counts = {datetime.date(2026, 1, 1): 2, datetime.date(2026, 3, 4): 70000}
+    packed = submission_calendar.pack_days(day_counts)
+    assert packed['start'] == datetime.date(2026, 1, 1).toordinal()
+    assert submission_calendar.unpack_days(packed) == {datetime.date(2026, 1, 1): 2, datetime.date(2026, 3, 4): packed_days.MAX_VALUE}
+    assert submission_calendar.pack_days({}) is None
+    assert submission_calendar.unpack_days(None) == {}
+    assert submission_calendar.unpack_days({'start': 1, 'counts': '!!'}) == {}
+
+
+def test_current_streak_allows_today_to_be_empty():
+    today = datetime.date(2026, 5, 10)
+    day = datetime.timedelta(days=1)
+    assert submission_calendar.current_streak({today - day: 1, today - 2 * day: 3}, today) == 2
+    assert submission_calendar.current_streak({today: 1, today - 2 * day: 1}, today) == 1
+    assert submission_calendar.current_streak({today - 2 * day: 1}, today) == 0
@@ -0,0 +1,31 @@
+from app.services import problem_index
+from app.services.problem_index import SolvedSet
+
+
+def test_intern_assigns_stable_ids():
+    first = problem_index.intern('test-index-alpha')
+    assert problem_index.intern('test-index-alpha') == first
+    assert problem_index.intern('test-index-beta') != first
+
+
+def test_solved_set_membership_and_size():
+    solved = SolvedSet.from_slugs(['test-index-one', 'test-index-two', 'test-index-one'])
+    assert len(solved) == 2
+    assert 'test-index-one' in solved
+    assert 'test-index-never-seen' not in solved
+    assert set(solved) == {'test-index-one', 'test-index-two'}
+    assert not SolvedSet()
+
+
+def test_union_returns_a_new_set():
+    solved = SolvedSet.from_slugs(['test-index-three'])
+    grown = solved.union(['test-index-four'])
+    assert 'test-index-four' in grown
+    assert 'test-index-four' not in solved
+
+
+def test_difference_and_count_common():
+    solved = SolvedSet.from_slugs(['test-index-five', 'test-index-six'])
+    assert solved.difference(['test-index-five', 'test-index-seven']) == {'test-index-seven'}
+    bits = problem_index.problems_bitset([{'titleSlug': 'test-index-six'}, {'titleSlug': 'test-index-eight'}, {}])
+    assert solved.count_common(bits) == 1
@@ -0,0 +1,68 @@
+from app.services.problem_search import ProblemSearchIndex, edit_distance, normalize
+
+PROBLEMS = [
+    {'title': 'Two Sum', 'titleSlug': 'two-sum'},
+    {'title': 'Two Sum II - Input Array Is Sorted', 'titleSlug': 'two-sum-ii-input-array-is-sorted'},
+    {'title': 'Valid Anagram', 'titleSlug': 'valid-anagram'},
+    {'title': 'Group Anagrams', 'titleSlug': 'group-anagrams'},
+    {'title': 'LRU Cache', 'titleSlug': 'lru-cache'},
+    {'title': 'Trapping Rain Water', 'titleSlug': 'trapping-rain-water'},
+    {'title': 'Contains Duplicate', 'titleSlug': 'contains-duplicate'},
+]
+
+
+def slugs(results):
+    return [problem['titleSlug'] for problem in results]
+
+
+def search(query, limit=5):
+    return slugs(ProblemSearchIndex(PROBLEMS).search(query, limit))
+
+
+def test_normalize_strips_punctuation_and_case():
+    assert normalize('  Two-Sum II!  ') == 'two sum ii'
+
+
+def test_edit_distance_counts_a_transposition_as_one_edit():
+    assert edit_distance('tow', 'two', 2) == 1
+    assert edit_distance('anagarm', 'anagram', 2) == 1
+
+
+def test_edit_distance_stops_above_the_limit():
+    assert edit_distance('cache', 'water', 1) == 2
+    assert edit_distance('a', 'abcdef', 2) == 3
+
+
+def test_exact_match_ranks_first():
+    assert search('two sum')[0] == 'two-sum'
+
+
+def test_prefix_match():
+    assert search('trap') == ['trapping-rain-water']
+
+
+def test_transposed_letters():
+    assert search('tow sum')[0] == 'two-sum'
+    assert search('anagarm')[:2] == ['valid-anagram', 'group-anagrams']
+
+
+def test_single_character_typos():
+    # substitution, deletion and insertion
+    assert search('lru cachr') == ['lru-cache']
+    assert search('contins duplicate') == ['contains-duplicate']
+    assert search('trappping rain') == ['trapping-rain-water']
+
+
+def test_partial_last_word_with_a_typo():
+    assert search('valid anagr')[0] == 'valid-anagram'
+    assert search('valid anaf')[0] == 'valid-anagram'
+
+
+def test_unrelated_query_has_no_results():
+    assert search('zzzz qqqq') == []
+
+
+def test_limit_and_duplicate_slugs():
+    index = ProblemSearchIndex(PROBLEMS + [{'title': 'Two Sum', 'titleSlug': 'two-sum'}])
+    assert len(index) == len(PROBLEMS)
+    assert len(index.search('two', 1)) == 1
@@ -0,0 +1,109 @@
+from app.services.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryBudget, TokenBucket, backoff_delay
+
+
+def make_breaker(clock):
+    return CircuitBreaker(error_threshold=0.5, min_requests=4, window_seconds=60, cooldown_seconds=30, clock=clock.time)
+
+
+def trip(breaker):
+    for _ in range(4):
+        assert breaker.allow()
+        breaker.record_failure()
+
+
+def test_breaker_opens_once_the_error_rate_crosses_the_threshold(clock):
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.allow()
+        breaker.record_failure()
+    assert breaker.state()['state'] == CLOSED  # below min_requests
+    breaker.allow()
+    breaker.record_failure()
+    assert breaker.state()['state'] == OPEN
+    assert not breaker.allow()
+    assert breaker.state()['rejected'] == 1
+
+
+def test_breaker_stays_closed_while_errors_are_rare(clock):
+    breaker = make_breaker(clock)
+    for i in range(10):
+        breaker.allow()
+        breaker.record_failure() if i % 4 == 0 else breaker.record_success()
+    assert breaker.state()['state'] == CLOSED
+
+
+def test_half_open_lets_one_probe_through_and_closes_on_success(clock):
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    assert breaker.state()['state'] == HALF_OPEN
+    assert not breaker.allow()  # the probe is still in flight
+    breaker.record_success()
+    assert breaker.state()['state'] == CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state()['state'] == OPEN
+    assert breaker.state()['times_opened'] == 2
+    assert not breaker.allow()
+
+
+def test_lost_probe_is_replaced_after_another_cooldown(clock):
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()  # this probe never reports back
+    clock.now += 10
+    assert not breaker.allow()
+    clock.now += 20
+    assert breaker.allow()
+
+
+def test_outcomes_outside_the_window_are_forgotten(clock):
+    breaker = make_breaker(clock)
+    for _ in range(3):
+        breaker.record_failure()
+    clock.now += 61
+    breaker.record_failure()
+    assert breaker.state()['failures_in_window'] == 1
+    assert breaker.state()['state'] == CLOSED
+
+
+def test_retry_budget_is_a_fraction_of_traffic(clock):
+    budget = RetryBudget(ratio=0.5, min_per_second=0, max_tokens=2, clock=clock.time)
+    assert budget.try_spend() and budget.try_spend()
+    assert not budget.try_spend()
+    budget.deposit()
+    budget.deposit()
+    assert budget.try_spend()
+    assert budget.state()['denied'] == 1
+
+
+def test_token_bucket_waits_for_a_token_within_the_timeout(clock):
+    bucket = TokenBucket(rate=2, capacity=1, clock=clock.time, sleep=clock.sleep)
+    assert bucket.acquire(0)
+    assert not bucket.acquire(0.1)
+    assert bucket.acquire(1)
+    assert bucket.state()['throttled'] == 1
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, 0.2, 2.0) <= 2.0
+
+
+def test_cancelled_probe_can_be_retried_at_once(clock):
+    breaker = make_breaker(clock)
+    trip(breaker)
+    clock.now += 30
+    assert breaker.allow()
+    breaker.cancel()  # e.g. the rate limiter refused the probe
+    assert breaker.allow()
+    assert breaker.state()['state'] == HALF_OPEN
@@ -0,0 +1,66 @@
+from flask import Flask
+
+from app.services import solved_index
+from app.services.cache import TTLCache
+from app.services.problem_index import SolvedSet
+
+
+def make_app():
+    app = Flask(__name__)
+    app.config.update(LEETCODE_FANOUT_TIMEOUT=5, LEETCODE_SNAPSHOT_SUBMISSIONS=3, SOLVED_INDEX_WIDE_WINDOW=5)
+    return app
+
+
+def test_sync_users_only_resyncs_users_older_than_the_ttl(monkeypatch, clock):
+    app = make_app()
+    monkeypatch.setattr(solved_index, '_recent_syncs', TTLCache('test_syncs', 300, 300, 100, clock=clock.time))
+    monkeypatch.setattr(solved_index, '_load_index', lambda username: (SolvedSet(), 0))
+    monkeypatch.setattr(solved_index.fanout, 'fan_out',
+                        lambda func, keys, default=None, timeout=None: {key: func(key) for key in keys})
+    fetched = []
+    monkeypatch.setattr(solved_index, '_newer_submissions', lambda username, mark: (fetched.append(username), ([], True))[1])
+
+    with app.app_context():
+        assert set(solved_index.sync_users(['ann', 'bob', 'ann'])) == {'ann', 'bob'}
+        clock.now += 299
+        assert solved_index.sync_users(['ann', 'bob']) == {}
+        solved_index.sync_user('bob')
+        clock.now += 1
+        assert set(solved_index.sync_users(['ann', 'bob'])) == {'ann'}
+
+    assert fetched == ['ann', 'bob', 'bob', 'ann']
+
+
+def submissions(*timestamps):
+    return [{'titleSlug': f'test-sync-{ts}', 'timestamp': str(ts), 'statusDisplay': 'Accepted'} for ts in timestamps]
+
+
+def sync_with_windows(monkeypatch, clock, snapshot, wider, mark):
+    """Runs sync_user against fake submission windows and returns (stored mark, wide fetches made)."""
+    monkeypatch.setattr(solved_index, '_recent_syncs', TTLCache('test_syncs', 300, 300, 100, clock=clock.time))
+    monkeypatch.setattr(solved_index, '_load_index', lambda username: (SolvedSet(), mark))
+    monkeypatch.setattr(solved_index, '_remember', lambda username, index: (SolvedSet(), index['high_water_mark']))
+    monkeypatch.setattr(solved_index.challenge_progress, 'apply_solved_update', lambda username, solved: None)
+    monkeypatch.setattr(solved_index.leetcode_api, 'get_recent_submissions', lambda username, limit: snapshot[:limit])
+    wide_fetches, stored = [], {}
+    monkeypatch.setattr(solved_index.leetcode_api, 'fetch_recent_submissions',
+                        lambda username, limit: (wide_fetches.append(limit), wider[:limit])[1])
+    monkeypatch.setattr(solved_index.firebase_service, 'update_solved_index',
+                        lambda username, slugs, new_mark: stored.update(high_water_mark=new_mark) or stored)
+    with make_app().app_context():
+        solved_index.sync_user('ann')
+    return stored.get('high_water_mark'), wide_fetches
+
+
+def test_sync_reads_only_the_snapshot_when_it_reaches_the_mark(monkeypatch, clock):
+    assert sync_with_windows(monkeypatch, clock, submissions(30, 20, 10), None, 15) == (30, [])
+
+
+def test_sync_widens_a_window_that_is_entirely_newer_than_the_mark(monkeypatch, clock):
+    mark, wide_fetches = sync_with_windows(monkeypatch, clock, submissions(50, 40, 30), submissions(50, 40, 30, 20, 10), 15)
+    assert (mark, wide_fetches) == (50, [5])
+
+
+def test_sync_does_not_move_the_mark_past_solves_it_could_not_see(monkeypatch, clock):
+    window = submissions(70, 60, 50, 40, 30)
+    assert sync_with_windows(monkeypatch, clock, window, window, 15) == (30, [5])